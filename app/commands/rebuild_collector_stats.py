@@ -0,0 +1,33 @@
+"""
+Пересборка часовых корзин аналитики collector_stats_hourly по collector_lead.
+
+Нужна, если корзины разошлись с исходными записями, например после
+ручного изменения collector_lead. Приём переходов и заявок на время
+пересборки ждёт её окончания.
+
+Запуск из корня репозитория:
+    python -m app.commands.rebuild_collector_stats [--collector-id ID]
+"""
+import argparse
+import asyncio
+
+from app.core.database import SessionLocal, engine
+from app.crud.collector_stats import rebuild_collector_stats
+# Модели импортируются, как в app.main, чтобы связи между ними разрешились
+from app.models import combined, group, group_notification_status, lead, collector, notification, vk_profile, telegram_outbox, counter_shard, idempotency_key, collector_stats
+
+
+async def main(collector_id: int = None) -> None:
+    try:
+        async with SessionLocal() as session:
+            buckets = await rebuild_collector_stats(session, collector_id)
+        print(f"rebuilt {buckets} hourly buckets")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild collector_stats_hourly from collector_lead")
+    parser.add_argument("--collector-id", type=int, default=None, help="rebuild only this collector")
+    args = parser.parse_args()
+    asyncio.run(main(args.collector_id))
@@ -0,0 +1,31 @@
+"""
+Пересчёт счётчиков collectors.count_leads и groups.collector_count
+по collector_lead и collectors с очисткой шардов counter_shards.
+
+Нужен, если итоги разошлись с исходными данными, например после
+ручного изменения collector_lead. На время пересчёта таблица шардов
+заблокирована от записи, и приём заявок ждёт его окончания.
+Кэши групп в запущенных процессах обновятся по истечении их TTL.
+
+Запуск из корня репозитория:
+    python -m app.commands.reconcile_counters
+"""
+import asyncio
+
+from app.core.database import SessionLocal, engine
+from app.crud.counter import reconcile_counters
+# Модели импортируются, как в app.main, чтобы связи между ними разрешились
+from app.models import combined, group, group_notification_status, lead, collector, notification, vk_profile, telegram_outbox, counter_shard, idempotency_key, collector_stats
+
+
+async def main() -> None:
+    try:
+        async with SessionLocal() as session:
+            await reconcile_counters(session)
+        print("counters reconciled")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
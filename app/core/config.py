@@ -1,3 +1,4 @@
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -10,6 +11,90 @@ class Settings(BaseSettings):
     admin_id_first: str
     admin_id_second: str
     admin_id_third: str
+
+    # Кэш проверенных токенов VK Mini Apps (ключ - подпись sign)
+    auth_token_cache_ttl: int = 300
+    auth_token_cache_size: int = 10000
+
+    # Токен для служебных эндпоинтов /api/metrics (заголовок Authorization: Bearer).
+    # Если не задан, эндпоинты метрик отключены
+    metrics_token: Optional[str] = None
+
+    # Кэш групп по vk_id для зависимости авторизации
+    group_cache_ttl: int = 60
+    group_cache_size: int = 10000
+
+    # Кэш профилей VK (имя и фото лидов) в таблице vk_profiles
+    vk_profile_max_age: int = 86400
+    vk_profile_refresh_interval: int = 60
+    vk_profile_refresh_batch: int = 1000
+
+    # Общий HTTP-клиент для интеграций (секунды для таймаутов)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_default_timeout: float = 10.0
+    vk_api_timeout: float = 10.0
+    telegram_api_timeout: float = 15.0
+
+    # Ограничение частоты вызовов VK API на стороне клиента
+    vk_api_rate_limit: float = 3.0
+    vk_api_burst: int = 3
+    vk_api_max_retries: int = 5
+    vk_api_backoff_base: float = 0.5
+    vk_api_backoff_max: float = 10.0
+
+    # Очередь доставки сообщений в Telegram (telegram_outbox)
+    telegram_outbox_poll_interval: float = 5.0
+    telegram_outbox_batch_size: int = 50
+    telegram_outbox_max_attempts: int = 10
+    telegram_outbox_lease: int = 60
+    telegram_outbox_backoff_base: float = 5.0
+    telegram_outbox_backoff_max: float = 3600.0
+
+    # Приём переходов лидов: "direct" - запись в запросе,
+    # "buffered" - ответ 202 и запись пачками из буфера в памяти
+    lead_ingest_mode: Literal["direct", "buffered"] = "direct"
+    lead_ingest_buffer_size: int = 10000
+    lead_ingest_batch_size: int = 1000
+    lead_ingest_flush_interval: float = 0.2
+    lead_ingest_flush_retries: int = 3
+    lead_ingest_retry_delay: float = 0.5
+
+    # Фоновые воркеры (обогащение лидов, обновление профилей VK, отправка
+    # в Telegram, сжатие счётчиков, очистка ключей идемпотентности).
+    # Тесты отключают их, чтобы воркеры не выполняли запросы параллельно
+    background_workers_enabled: bool = True
+
+    # Шардированные счётчики заявок коллекторов и сборщиков групп
+    counter_shard_count: int = 16
+    counter_compact_interval: float = 5.0
+
+    # Ответы по ключам идемпотентности (заголовок Idempotency-Key):
+    # кэш процесса и, при idempotency_db_enabled, таблица idempotency_keys.
+    # Ключ запроса, не завершившегося за idempotency_pending_timeout, освобождается
+    idempotency_key_ttl: int = 86400
+    idempotency_cache_size: int = 10000
+    idempotency_db_enabled: bool = False
+    idempotency_pending_timeout: float = 60.0
+    idempotency_cleanup_interval: float = 3600.0
+
+    # Размер страницы списка лидов коллектора
+    leads_page_size: int = 50
+    leads_page_size_max: int = 500
+
+    # Публичная карточка коллектора для страниц посетителей: кэш процесса
+    # и время кэширования ответа в nginx и браузерах (Cache-Control max-age)
+    collector_snapshot_cache_ttl: int = 60
+    collector_snapshot_cache_size: int = 10000
+    collector_snapshot_max_age: int = 30
+
+    # Максимальная глубина ряда аналитики в днях
+    analytics_series_max_days: int = 366
+
+    # Кэш аналитики коллекторов и групп (секунды)
+    analytics_cache_ttl: float = 5.0
+    analytics_cache_size: int = 10000
     
     class Config:
         env_file = ".env"
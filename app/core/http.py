@@ -0,0 +1,79 @@
+import importlib.util
+from typing import Optional
+
+import httpx
+
+from app.core.config import settings
+
+# Общий HTTP-клиент воркера для интеграций (VK, Telegram).
+# Создаётся в lifespan приложения и переиспользует keep-alive соединения,
+# чтобы каждый вызов не платил за TCP и TLS handshake заново.
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_supported() -> bool:
+    # httpx поддерживает HTTP/2 только при установленном пакете h2
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=_http2_supported(),
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry
+        ),
+        timeout=httpx.Timeout(settings.http_default_timeout)
+    )
+
+
+async def start_http_client() -> None:
+    global _client
+    if _client is None:
+        _client = create_http_client()
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Получить общий HTTP-клиент.
+    Если lifespan не запускался (например, в скриптах), клиент создаётся лениво.
+    """
+    global _client
+    if _client is None:
+        _client = create_http_client()
+    return _client
+
+
+def get_http_pool_stats() -> dict:
+    """
+    Статистика пула соединений общего HTTP-клиента.
+
+    Пул читается из внутренних атрибутов httpx и httpcore. Если в другой
+    версии библиотек их нет, количество соединений возвращается как None.
+    """
+    connections = idle = None
+    try:
+        pool = _client._transport._pool if _client is not None else None
+        if pool is not None:
+            pool_connections = list(pool.connections)
+            connections = len(pool_connections)
+            idle = sum(1 for connection in pool_connections if connection.is_idle())
+    except (AttributeError, TypeError):
+        connections = idle = None
+    return {
+        "started": _client is not None,
+        "http2": _client is not None and _http2_supported(),
+        "max_connections": settings.http_max_connections,
+        "max_keepalive_connections": settings.http_max_keepalive_connections,
+        "connections": connections,
+        "in_use": None if connections is None else connections - idle,
+        "idle": idle,
+    }
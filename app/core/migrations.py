@@ -0,0 +1,171 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Изменения схемы для уже существующих баз.
+# create_all создаёт только отсутствующие таблицы, поэтому новые колонки,
+# ограничения и индексы существующих таблиц добавляются здесь.
+# Миграции применяются по порядку и один раз, применённые записываются
+# в schema_migrations. Для новой базы create_all уже создаёт всё по моделям,
+# поэтому операторы должны быть идемпотентными (IF NOT EXISTS).
+MIGRATIONS = [
+    (
+        "0001_leads_vk_id_unique",
+        [
+            # Дубликаты лидов с одинаковым vk_id сливаются в лид с минимальным id
+            """
+            CREATE TEMP TABLE lead_duplicates ON COMMIT DROP AS
+            SELECT id, keep_id
+            FROM (
+                SELECT id, min(id) OVER (PARTITION BY vk_id) AS keep_id
+                FROM leads
+                WHERE vk_id IS NOT NULL
+            ) AS ranked
+            WHERE id <> keep_id
+            """,
+            """
+            CREATE TEMP TABLE merged_visits ON COMMIT DROP AS
+            SELECT cl.collector_id,
+                   coalesce(d.keep_id, cl.lead_id) AS lead_id,
+                   bool_or(cl.checked_form) AS checked_form,
+                   bool_or(cl.request_form) AS request_form,
+                   min(cl.datetime_request) AS datetime_request
+            FROM collector_lead cl
+            LEFT JOIN lead_duplicates d ON d.id = cl.lead_id
+            WHERE cl.lead_id IN (SELECT id FROM lead_duplicates UNION SELECT keep_id FROM lead_duplicates)
+            GROUP BY 1, 2
+            """,
+            """
+            DELETE FROM collector_lead
+            WHERE lead_id IN (SELECT id FROM lead_duplicates UNION SELECT keep_id FROM lead_duplicates)
+            """,
+            """
+            INSERT INTO collector_lead (collector_id, lead_id, checked_form, request_form, datetime_request)
+            SELECT collector_id, lead_id, checked_form, request_form, datetime_request FROM merged_visits
+            """,
+            "DELETE FROM leads WHERE id IN (SELECT id FROM lead_duplicates)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS leads_vk_id_key ON leads (vk_id)",
+            # Заявки дубликатов слились, поэтому счётчики заявок затронутых
+            # коллекторов пересчитываются по collector_lead, как в reconcile_counters
+            """
+            DELETE FROM counter_shards
+            WHERE kind = 'collector_leads' AND owner_id IN (SELECT collector_id FROM merged_visits)
+            """,
+            """
+            UPDATE collectors SET count_leads = (
+                SELECT count(*) FROM collector_lead cl
+                WHERE cl.collector_id = collectors.id AND cl.request_form
+            )
+            WHERE id IN (SELECT collector_id FROM merged_visits)
+            """,
+        ]
+    ),
+    (
+        "0002_collector_lead_requests_index",
+        [
+            """
+            CREATE INDEX IF NOT EXISTS ix_collector_lead_requests
+            ON collector_lead (collector_id, datetime_request DESC NULLS LAST, lead_id DESC)
+            WHERE request_form
+            """,
+        ]
+    ),
+    (
+        "0003_leads_trigram_search",
+        [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            r"""
+            ALTER TABLE leads ADD COLUMN IF NOT EXISTS phone_normalized VARCHAR
+            GENERATED ALWAYS AS (regexp_replace(coalesce(phone, ''), '\D', '', 'g')) STORED
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_leads_full_name_trgm ON leads USING gin (full_name gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS ix_leads_phone_normalized_trgm ON leads USING gin (phone_normalized gin_trgm_ops)",
+        ]
+    ),
+    (
+        "0004_collector_stats_hourly_backfill",
+        [
+            # Таблицу создаёт create_all, здесь она заполняется по существующим
+            # переходам так же, как в rebuild_collector_stats
+            """
+            INSERT INTO collector_stats_hourly (collector_id, hour, visits, submissions)
+            SELECT collector_id,
+                   date_trunc('hour', coalesce(datetime_request, TIMESTAMP '1970-01-01')),
+                   count(*),
+                   count(*) FILTER (WHERE request_form)
+            FROM collector_lead
+            GROUP BY 1, 2
+            ON CONFLICT DO NOTHING
+            """,
+        ]
+    ),
+    (
+        "0005_collector_lead_datetime_visit",
+        [
+            # Время перехода раньше не сохранялось. Старые записи учтены в корзине
+            # времени заявки или UNKNOWN_HOUR, оно и становится временем перехода
+            "ALTER TABLE collector_lead ADD COLUMN IF NOT EXISTS datetime_visit TIMESTAMP",
+            "UPDATE collector_lead SET datetime_visit = coalesce(datetime_request, '1970-01-01') "
+            "WHERE datetime_visit IS NULL",
+        ]
+    ),
+    (
+        "0006_idempotency_keys_request_hash",
+        [
+            # Сохранённые ответы без хэша запроса нельзя сверить с повтором, поэтому удаляются
+            "DELETE FROM idempotency_keys",
+            "ALTER TABLE idempotency_keys ADD COLUMN IF NOT EXISTS request_hash VARCHAR NOT NULL",
+            "ALTER TABLE idempotency_keys ALTER COLUMN status_code DROP NOT NULL",
+            "ALTER TABLE idempotency_keys ALTER COLUMN body DROP NOT NULL",
+        ]
+    ),
+    (
+        "0007_collector_stats_hourly_shards",
+        [
+            "ALTER TABLE collector_stats_hourly ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0",
+            # Для новой базы create_all уже создал ключ с shard, пересоздание пустой таблице ничего не стоит
+            """
+            ALTER TABLE collector_stats_hourly
+            DROP CONSTRAINT IF EXISTS collector_stats_hourly_pkey,
+            ADD PRIMARY KEY (collector_id, hour, shard)
+            """,
+        ]
+    ),
+    (
+        "0008_drop_collector_lead_visits_index",
+        [
+            # Индекс создавала прежняя версия 0005, запросов по нему нет
+            "DROP INDEX IF EXISTS ix_collector_lead_visits",
+        ]
+    ),
+    (
+        "0009_backfill_collector_lead_datetime_visit",
+        [
+            # Базы, где 0005 применена без заполнения, и импорт прежней версии
+            # оставили время перехода пустым. Заполняется тем же правилом, что в 0005
+            "UPDATE collector_lead SET datetime_visit = coalesce(datetime_request, '1970-01-01') "
+            "WHERE datetime_visit IS NULL",
+        ]
+    ),
+]
+
+# Ключ advisory lock, чтобы несколько воркеров не применяли миграции одновременно
+MIGRATIONS_LOCK_KEY = 7315001
+
+
+async def run_migrations(conn: AsyncConnection) -> None:
+    """
+    Применить недостающие миграции в рамках транзакции conn.
+    """
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "name VARCHAR PRIMARY KEY, applied_at TIMESTAMP NOT NULL DEFAULT now())"
+    ))
+    applied = set((await conn.execute(text("SELECT name FROM schema_migrations"))).scalars())
+
+    for name, statements in MIGRATIONS:
+        if name in applied:
+            continue
+        for statement in statements:
+            await conn.execute(text(statement))
+        await conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
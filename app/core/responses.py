@@ -0,0 +1,26 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    # Ответы эндпоинтов с response_model FastAPI уже привёл к dict/list,
+    # сюда попадают только модели, переданные в ответ напрямую
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON-ответ, кодируемый через orjson.
+
+    Используется как default_response_class приложения: эндпоинты
+    возвращают модели или dict, FastAPI проверяет их по response_model,
+    а итоговый dict/list кодируется orjson вместо json.dumps.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default)
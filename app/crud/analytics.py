@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+from typing import List, Literal, Optional
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.collector_stats import stats_hour
+from app.models.collector import Collector
+from app.models.collector_stats import CollectorStatsHourly
+from app.schemas.analytics import CollectorAnalytics, CollectorAnalyticsSeries
+
+# Шаг ряда аналитики
+SERIES_STEPS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# Периоды аналитики: количество последних часовых корзин, включая текущую
+ANALYTICS_PERIODS = {
+    "day": 24,
+    "week": 24 * 7,
+    "month": 24 * 30,
+}
+
+
+def period_start(period: Optional[str]) -> Optional[datetime]:
+    """
+    Начало первой часовой корзины периода или None для всего времени.
+
+    :raises ValueError: Если период неизвестен.
+    """
+    if period is None:
+        return None
+    if period not in ANALYTICS_PERIODS:
+        raise ValueError(f"Unknown analytics period: {period}")
+    return stats_hour(datetime.utcnow()) - timedelta(hours=ANALYTICS_PERIODS[period] - 1)
+
+
+async def get_group_analytics(
+    db: AsyncSession,
+    group_id: int,
+    period: Optional[str] = None,
+    collector_id: Optional[int] = None
+) -> List[CollectorAnalytics]:
+    """
+    Аналитика всех коллекторов группы одним запросом.
+
+    Часовые корзины collector_stats_hourly и их шарды суммируются одним GROUP BY
+    по коллекторам группы. Коллекторы без переходов за период тоже
+    попадают в результат, с нулями.
+
+    :param db: Асинхронная сессия базы данных.
+    :param group_id: ID группы-владельца коллекторов.
+    :param period: "day", "week", "month" или None для всего времени.
+    :param collector_id: Ограничить результат одним коллектором.
+    :return: Аналитика коллекторов в порядке их ID.
+    :raises ValueError: Если период неизвестен.
+    """
+    since = period_start(period)
+    buckets = CollectorStatsHourly.collector_id == Collector.id
+    if since is not None:
+        buckets = and_(buckets, CollectorStatsHourly.hour >= since)
+
+    query = (
+        select(
+            Collector.id,
+            func.coalesce(func.sum(CollectorStatsHourly.visits), 0),
+            func.coalesce(func.sum(CollectorStatsHourly.submissions), 0)
+        )
+        .outerjoin(CollectorStatsHourly, buckets)
+        .where(Collector.group_id == group_id)
+        .group_by(Collector.id)
+        .order_by(Collector.id)
+    )
+    if collector_id is not None:
+        query = query.where(Collector.id == collector_id)
+
+    return [
+        CollectorAnalytics(
+            collector_id=row_collector_id,
+            leads_count=leads_count,
+            visit_count=visit_count,
+            # Расчёт CR (лиды / посещения * 100%)
+            conversion_rate=(leads_count / visit_count * 100) if visit_count else 0.0
+        )
+        for row_collector_id, visit_count, leads_count in await db.execute(query)
+    ]
+
+
+async def get_collector_analytics(
+    db: AsyncSession,
+    collector_id: int,
+    group_id: int,
+    period: Optional[str] = None
+) -> Optional[CollectorAnalytics]:
+    """
+    Аналитика одного коллектора группы тем же запросом, что и для всей группы.
+
+    :return: Аналитика или None, если коллектор не найден в группе.
+    :raises ValueError: Если период неизвестен.
+    """
+    analytics = await get_group_analytics(db, group_id, period, collector_id)
+    return analytics[0] if analytics else None
+
+
+async def get_collector_series(
+    db: AsyncSession,
+    collector_id: int,
+    granularity: Literal["hour", "day"] = "day",
+    days: int = 30
+) -> CollectorAnalyticsSeries:
+    """
+    Ряд посетителей и заявок коллектора по часам или дням за последние days дней.
+
+    Часовые корзины collector_stats_hourly сворачиваются date_trunc
+    до нужного интервала и соединяются с generate_series, поэтому
+    интервалы без событий приходят нулями. Последний интервал - текущий.
+    Ряд возвращается колонками: массивами одинаковой длины.
+
+    :param db: Асинхронная сессия базы данных.
+    :param collector_id: ID коллектора.
+    :param granularity: "hour" или "day".
+    :param days: Глубина ряда в днях.
+    """
+    step = SERIES_STEPS[granularity]
+    points = days * 24 if granularity == "hour" else days
+    end = stats_hour(datetime.utcnow())
+    if granularity == "day":
+        end = end.replace(hour=0)
+    start = end - step * (points - 1)
+
+    buckets = func.generate_series(start, end, step).table_valued("bucket").render_derived("buckets")
+    bucket = func.date_trunc(granularity, CollectorStatsHourly.hour)
+    totals = (
+        select(
+            bucket.label("bucket"),
+            func.sum(CollectorStatsHourly.visits).label("visits"),
+            func.sum(CollectorStatsHourly.submissions).label("submissions")
+        )
+        .where(
+            CollectorStatsHourly.collector_id == collector_id,
+            CollectorStatsHourly.hour >= start
+        )
+        .group_by(bucket)
+        .subquery("totals")
+    )
+    rows = (await db.execute(
+        select(
+            buckets.c.bucket,
+            func.coalesce(totals.c.visits, 0),
+            func.coalesce(totals.c.submissions, 0)
+        )
+        .outerjoin(totals, totals.c.bucket == buckets.c.bucket)
+        .order_by(buckets.c.bucket)
+    )).all()
+
+    timestamps, visits, leads = (list(column) for column in zip(*rows)) if rows else ([], [], [])
+    return CollectorAnalyticsSeries(
+        collector_id=collector_id,
+        granularity=granularity,
+        timestamps=timestamps,
+        visits=visits,
+        leads=leads
+    )
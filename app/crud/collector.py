@@ -1,87 +1,103 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, delete
-from sqlalchemy.orm import selectinload
+from sqlalchemy import insert, update, delete
+from sqlalchemy.engine import Row
 from app.models.collector import Collector
 from app.models.combined import CollectorLead  
-from app.schemas.collector import CollectorCreate, CollectorRead, CollectorReadWithVkId
-from app.schemas.analytics import CollectorAnalytics
+from app.schemas.collector import CollectorCreate, CollectorPublic
 from app.models.collector import Collector
 from app.models.lead import Lead
 from app.models.group import Group
-from typing import Optional, List
+from typing import Optional, NamedTuple, Sequence
 from sqlalchemy import func
+from hashlib import sha256
 
 from app.schemas.group import GroupRead
+from app.crud.group import invalidate_group_cache
+from app.crud.counter import GROUP_COLLECTORS, increment_counter
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+
+class CollectorSnapshot(NamedTuple):
+    """
+    Сериализованная публичная карточка коллектора и её версия.
+    ETag - хэш тела, поэтому одинаков во всех процессах.
+    """
+    body: bytes
+    etag: str
+
+
+# Кэш публичных карточек по ID коллектора: страницы посетителей
+# читают карточку на каждый переход, а меняется она редко
+_collector_snapshots = TTLCache(
+    maxsize=settings.collector_snapshot_cache_size,
+    ttl=settings.collector_snapshot_cache_ttl
+)
+
+
+def invalidate_collector_snapshot(collector_id: int) -> None:
+    """
+    Удалить из кэша публичную карточку коллектора.
+    """
+    _collector_snapshots.pop(collector_id)
+
+# Колонки CollectorRead: crud читает и возвращает только их, без загрузки
+# связанных объектов. Строки проверяет response_model эндпоинта
+COLLECTOR_READ_COLUMNS = (
+    Collector.id,
+    Collector.name,
+    Collector.description,
+    Collector.transcription,
+    Collector.client_path_type,
+    Collector.client_path,
+    Collector.plugin,
+    Collector.count_leads,
+    Collector.request_phone_numbers,
+    Collector.first_bonus,
+    Collector.second_bonus,
+    Collector.third_bonus,
+)
+
 
 # Создание нового коллектора
-async def create_collector(db: AsyncSession, group_id: int, collector_data: CollectorCreate) -> CollectorRead:
-    collector = Collector(
-        name=collector_data.name,
-        transcription=collector_data.transcription,
-        client_path_type=collector_data.client_path_type.value.upper(),
-        client_path=collector_data.client_path,
-        plugin=collector_data.plugin.value.upper() if collector_data.plugin else None,
-        group_id=group_id,
-        description=collector_data.description,
-        count_leads=collector_data.count_leads
+async def create_collector(db: AsyncSession, group_id: int, collector_data: CollectorCreate) -> Row:
+    result = await db.execute(
+        insert(Collector)
+        .values(
+            name=collector_data.name,
+            transcription=collector_data.transcription,
+            client_path_type=collector_data.client_path_type.value.upper(),
+            client_path=collector_data.client_path,
+            plugin=collector_data.plugin.value.upper() if collector_data.plugin else None,
+            group_id=group_id,
+            description=collector_data.description
+        )
+        .returning(*COLLECTOR_READ_COLUMNS)
     )
-    db.add(collector)
-    group = await db.execute(select(Group).where(Group.id == group_id))
-    group = group.scalar_one_or_none()
-    group.collector_count += 1
+    collector = result.one()
+    await increment_counter(db, GROUP_COLLECTORS, group_id)
     
     await db.commit()
-    await db.refresh(collector)
-
-    collector_dict = {
-        "id": collector.id,
-        "name": collector.name,
-        "description": collector.description,
-        "transcription": collector.transcription,
-        "client_path_type": collector.client_path_type,
-        "client_path": collector.client_path,
-        "plugin": collector.plugin,
-        "count_leads": collector.count_leads,
-        "request_phone_numbers": collector.request_phone_numbers,
-        "first_bonus": collector.first_bonus,
-        "second_bonus": collector.second_bonus,
-        "third_bonus": collector.third_bonus
-    }
-    return CollectorRead(**collector_dict)
+    invalidate_group_cache(group_id)
+    return collector
 
 
 # Получение всех коллекторов по ID пользователя
-async def get_collectors_by_group(db: AsyncSession, group_id: int) -> List[CollectorRead]:
+async def get_collectors_by_group(db: AsyncSession, group_id: int) -> Sequence[Row]:
     result = await db.execute(
-        select(Collector)
-        .options(selectinload(Collector.group), selectinload(Collector.collector_leads))
-        .filter(Collector.group_id == group_id)
+        select(*COLLECTOR_READ_COLUMNS)
+        .where(Collector.group_id == group_id)
+        .order_by(Collector.id)
     )
-    collectors = result.scalars().all()
-
-    return [
-        CollectorRead(**{
-            "id": c.id,
-            "name": c.name,
-            "description": c.description,
-            "transcription": c.transcription,
-            "client_path_type": c.client_path_type,
-            "client_path": c.client_path,
-            "plugin": c.plugin,
-            "count_leads": c.count_leads,
-            "request_phone_numbers": c.request_phone_numbers,
-            "first_bonus": c.first_bonus,
-            "second_bonus": c.second_bonus,
-            "third_bonus": c.third_bonus
-        }) for c in collectors
-    ]
+    return result.all()
 
 
 async def update_collector(
     db: AsyncSession, collector_id: int, collector_data: CollectorCreate
-) -> Optional[CollectorRead]:
-    # Выполняем обновление и возвращаем только ID
+) -> Optional[Row]:
+    # Обновляем и сразу возвращаем колонки CollectorRead. count_leads из
+    # запроса не записывается: его ведут шардированные счётчики заявок
     result = await db.execute(
         update(Collector)
         .where(Collector.id == collector_id)
@@ -92,130 +108,70 @@ async def update_collector(
             client_path=collector_data.client_path,
             plugin=collector_data.plugin.value.upper() if collector_data.plugin else None,
             description=collector_data.description,
-            count_leads=collector_data.count_leads,
             request_phone_numbers=collector_data.request_phone_numbers,
             first_bonus=collector_data.first_bonus,
             second_bonus=collector_data.second_bonus,
             third_bonus=collector_data.third_bonus
         )
-        .returning(Collector.id)
+        .returning(*COLLECTOR_READ_COLUMNS)
     )
-    collector_id = result.scalar_one_or_none()
+    collector = result.first()
     await db.commit()
-        
-    if collector_id:
-        # Выполняем запрос для полной загрузки объекта коллектора
-        collector = await db.get(Collector, collector_id)
-
-        if collector:
-            collector_dict = {
-                "id": collector.id,
-                "name": collector.name,
-                "description": collector.description,
-                "transcription": collector.transcription,
-                "client_path_type": collector.client_path_type,
-                "client_path": collector.client_path,
-                "plugin": collector.plugin,
-                "count_leads": collector.count_leads,
-                "request_phone_numbers": collector.request_phone_numbers,
-                "first_bonus": collector.first_bonus,
-                "second_bonus": collector.second_bonus,
-                "third_bonus": collector.third_bonus
-            }
-            return CollectorRead(**collector_dict)
-        await db.commit()   
-    await db.rollback()
-    return None
+
+    if collector:
+        invalidate_collector_snapshot(collector_id)
+    return collector
 
 
 # Удаление коллектора по его ID
 async def delete_collector(db: AsyncSession, collector_id: int) -> bool:
-    result = await db.execute(delete(Collector).where(Collector.id == collector_id))
-    
-    group = await db.execute(select(Group).where(Group.id == collector_id))
-    group = group.scalar_one_or_none()
-    group.collector_count -= 1
+    result = await db.execute(
+        delete(Collector).where(Collector.id == collector_id).returning(Collector.group_id)
+    )
+    group_id = result.scalar_one_or_none()
+    if group_id is None:
+        await db.rollback()
+        return False
+
+    await increment_counter(db, GROUP_COLLECTORS, group_id, delta=-1)
     await db.commit()
-    return result.rowcount > 0
+    invalidate_group_cache(group_id)
+    invalidate_collector_snapshot(collector_id)
+    return True
 
 
-# Получение коллектора по его ID
-async def get_collector_by_id(session: AsyncSession, collector_id: int, group: GroupRead = None) -> Optional[CollectorReadWithVkId]:
-    
-    if group:
-        result = await session.execute(
-            select(Collector)
-            .options(selectinload(Collector.group), selectinload(Collector.collector_leads))
-            .filter(Collector.id == collector_id, Collector.group_id == group.id)
-        )
-    else:
-        result = await session.execute(
-            select(Collector)
-            .options(selectinload(Collector.group), selectinload(Collector.collector_leads))
-            .filter(Collector.id == collector_id)
-        )
-    result_collector = result.scalar_one_or_none()
-    
-    if not result_collector:
-        return None
-    
-    group_vk_id = await session.execute(
-        select(Group.vk_id)
-        .where(Group.id == result_collector.group_id)
+# Проверка, что коллектор существует и принадлежит группе, без загрузки связанных данных
+async def collector_belongs_to_group(db: AsyncSession, collector_id: int, group_id: int) -> bool:
+    collector_id = await db.scalar(
+        select(Collector.id).where(Collector.id == collector_id, Collector.group_id == group_id)
     )
-    group_vk_id = group_vk_id.scalar_one_or_none()
-
-    if result_collector:
-        collector_dict = {
-            "id": result_collector.id,
-            "name": result_collector.name,
-            "description": result_collector.description,
-            "transcription": result_collector.transcription,
-            "client_path_type": result_collector.client_path_type,
-            "client_path": result_collector.client_path,
-            "plugin": result_collector.plugin,
-            "count_leads": result_collector.count_leads,
-            "request_phone_numbers": result_collector.request_phone_numbers,
-            "first_bonus": result_collector.first_bonus,
-            "second_bonus": result_collector.second_bonus,
-            "third_bonus": result_collector.third_bonus,
-            "vk_id": group_vk_id
-        }
-        return CollectorReadWithVkId(**collector_dict)
-    return None
-
-
-# Получение аналитики по коллекторам
-async def get_collector_analytics(db: AsyncSession, collector_id: int, group: GroupRead) -> Optional[CollectorAnalytics]:
-    # Проверяем, существует ли коллектор
-    collector = await db.execute(select(Collector).where(Collector.id == collector_id)
-                                 .where(Collector.group_id == group.id))
-    collector = collector.scalar_one_or_none()
-    if not collector:
-        return None
+    return collector_id is not None
 
-    # Подсчитываем количество лидов, которые отправили заявку (request_form=True)
-    lead_count_query = await db.execute(
-        select(func.count(CollectorLead.lead_id))
-        .where(CollectorLead.collector_id == collector_id)
-        .where(CollectorLead.request_form == True)
-    )
-    lead_count = lead_count_query.scalar() or 0
 
-    # Подсчитываем общее количество посещений (лиды, у которых request_form=False)
-    visit_count_query = await db.execute(
-        select(func.count(CollectorLead.lead_id))
-        .where(CollectorLead.collector_id == collector_id)
+# Получение коллектора по его ID вместе с VK ID группы-владельца одним запросом
+async def get_collector_by_id(session: AsyncSession, collector_id: int, group: GroupRead = None) -> Optional[Row]:
+    query = (
+        select(*COLLECTOR_READ_COLUMNS, Group.vk_id)
+        .join(Group, Group.id == Collector.group_id)
+        .where(Collector.id == collector_id)
     )
-    visit_count = visit_count_query.scalar() or 0
-
-    # Расчёт CR (лиды / посещения * 100%)
-    conversion_rate = (lead_count / visit_count * 100) if visit_count > 0 else 0
-
-    # Возвращаем объект CollectorAnalytics для валидации
-    return CollectorAnalytics(
-        collector_id=collector_id,
-        leads_count=lead_count,
-        visit_count=visit_count,
-        conversion_rate=conversion_rate
-    )
\ No newline at end of file
+    if group:
+        query = query.where(Collector.group_id == group.id)
+
+    return (await session.execute(query)).first()
+
+
+# Публичная карточка коллектора из кэша процесса, при промахе - из базы
+async def get_collector_snapshot(session: AsyncSession, collector_id: int) -> Optional[CollectorSnapshot]:
+    snapshot = _collector_snapshots.get(collector_id)
+    if snapshot is not None:
+        return snapshot
+
+    collector = await get_collector_by_id(session, collector_id)
+    if collector is None:
+        return None
+
+    body = CollectorPublic.model_validate(collector, from_attributes=True).model_dump_json().encode()
+    snapshot = CollectorSnapshot(body, '"%s"' % sha256(body).hexdigest()[:32])
+    _collector_snapshots.set(collector_id, snapshot)
+    return snapshot
@@ -0,0 +1,104 @@
+import random
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Select, delete, func, literal, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.collector_stats import CollectorStatsHourly
+from app.models.combined import CollectorLead
+
+# Корзина для переходов, время которых неизвестно: записанных до появления
+# collector_stats_hourly или импортированных без времени заявки.
+# Она учитывается в итогах за всё время и не попадает ни в один период
+UNKNOWN_HOUR = datetime(1970, 1, 1)
+
+
+def stats_hour(moment: datetime) -> datetime:
+    """
+    Начало часа, в корзину которого попадает событие.
+    """
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def record_stats_statement(source: Select):
+    """
+    Запрос, прибавляющий переходы и заявки к часовым корзинам коллекторов.
+
+    Запрос встраивается в CTE того же запроса, который записывает переходы
+    или заявки, поэтому корзины меняются в той же транзакции. Как и
+    increment_counter_statement, запрос пишет в случайный шард корзины,
+    чтобы параллельные писатели одного часа не ждали блокировку одной строки.
+    Чтение суммирует шарды.
+
+    :param source: SELECT с колонками (collector_id, hour, visits, submissions),
+        не более одной строки на пару (collector_id, hour). Если строк
+        несколько, их нужно упорядочить по collector_id, чтобы параллельные
+        запросы блокировали строки корзин в одном порядке.
+    """
+    shard = random.randrange(settings.counter_shard_count)
+    statement = insert(CollectorStatsHourly).from_select(
+        ["collector_id", "hour", "visits", "submissions", "shard"], source.add_columns(literal(shard))
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[CollectorStatsHourly.collector_id, CollectorStatsHourly.hour, CollectorStatsHourly.shard],
+        set_={
+            "visits": CollectorStatsHourly.visits + statement.excluded.visits,
+            "submissions": CollectorStatsHourly.submissions + statement.excluded.submissions,
+        }
+    )
+
+
+async def rebuild_collector_stats(db: AsyncSession, collector_id: Optional[int] = None) -> int:
+    """
+    Пересобрать часовые корзины по записям collector_lead.
+    Пересобранные корзины записываются в нулевой шард.
+
+    Переход попадает в час datetime_visit, заявка - в час datetime_request,
+    а если время неизвестно - в UNKNOWN_HOUR.
+    На время пересборки таблица корзин блокируется от записи, поэтому
+    переходы и заявки ждут окончания транзакции и не теряются.
+
+    :param collector_id: ID коллектора или None для всех коллекторов.
+    :return: Количество записанных корзин.
+    """
+    await db.execute(text("LOCK TABLE collector_stats_hourly IN EXCLUSIVE MODE"))
+
+    def hour(*moments):
+        return func.date_trunc("hour", func.coalesce(*moments, UNKNOWN_HOUR)).label("hour")
+
+    visits = select(
+        CollectorLead.collector_id,
+        hour(CollectorLead.datetime_visit),
+        literal(1).label("visits"),
+        literal(0).label("submissions")
+    )
+    submissions = select(
+        CollectorLead.collector_id,
+        hour(CollectorLead.datetime_request),
+        literal(0),
+        literal(1)
+    ).where(CollectorLead.request_form == True)
+    stale = delete(CollectorStatsHourly)
+    if collector_id is not None:
+        visits = visits.where(CollectorLead.collector_id == collector_id)
+        submissions = submissions.where(CollectorLead.collector_id == collector_id)
+        stale = stale.where(CollectorStatsHourly.collector_id == collector_id)
+
+    events = union_all(visits, submissions).subquery("events")
+    source = (
+        select(
+            events.c.collector_id, events.c.hour, func.sum(events.c.visits), func.sum(events.c.submissions), literal(0)
+        )
+        .group_by(events.c.collector_id, events.c.hour)
+    )
+
+    await db.execute(stale)
+    result = await db.execute(
+        insert(CollectorStatsHourly)
+        .from_select(["collector_id", "hour", "visits", "submissions", "shard"], source)
+    )
+    await db.commit()
+    return result.rowcount
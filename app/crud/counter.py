@@ -0,0 +1,116 @@
+import random
+from typing import List, Union
+
+from sqlalchemy import Select, delete, func, literal, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.collector import Collector
+from app.models.combined import CollectorLead
+from app.models.counter_shard import CounterShard
+from app.models.group import Group
+
+# Виды счётчиков: заявки коллектора (collectors.count_leads)
+# и сборщики группы (groups.collector_count)
+COLLECTOR_LEADS = "collector_leads"
+GROUP_COLLECTORS = "group_collectors"
+
+# Итоговая колонка, в которую сворачиваются шарды каждого вида
+_COUNTER_TOTALS = {
+    COLLECTOR_LEADS: (Collector, Collector.count_leads),
+    GROUP_COLLECTORS: (Group, Group.collector_count),
+}
+
+
+def increment_counter_statement(kind: str, owner_id: Union[int, Select], delta: int = 1):
+    """
+    Запрос, прибавляющий delta к случайному шарду счётчика.
+
+    Параллельные писатели попадают в разные шарды и не ждут блокировку
+    одной строки. Запрос можно выполнить отдельно или встроить в CTE.
+
+    :param kind: Вид счётчика.
+    :param owner_id: ID владельца или SELECT с одной колонкой ID владельцев.
+    :param delta: Приращение.
+    """
+    shard = random.randrange(settings.counter_shard_count)
+    if isinstance(owner_id, Select):
+        owner_ids = owner_id.subquery()
+        source = select(literal(kind), *owner_ids.c, literal(shard), literal(delta))
+        statement = insert(CounterShard).from_select(["kind", "owner_id", "shard", "value"], source)
+    else:
+        statement = insert(CounterShard).values(kind=kind, owner_id=owner_id, shard=shard, value=delta)
+    return statement.on_conflict_do_update(
+        index_elements=[CounterShard.kind, CounterShard.owner_id, CounterShard.shard],
+        set_={"value": CounterShard.value + statement.excluded.value}
+    )
+
+
+async def increment_counter(db: AsyncSession, kind: str, owner_id: int, delta: int = 1) -> None:
+    """
+    Прибавить delta к счётчику в текущей транзакции, без коммита.
+    """
+    await db.execute(increment_counter_statement(kind, owner_id, delta))
+
+
+async def compact_counters(db: AsyncSession) -> List[int]:
+    """
+    Свернуть шарды счётчиков в итоговые колонки коллекторов и групп.
+
+    Шарды удаляются и их сумма прибавляется к итогу одним запросом
+    на каждый вид счётчика. Шарды удалённых владельцев просто удаляются.
+
+    :return: ID групп, у которых изменилось количество сборщиков.
+    """
+    group_ids = []
+    for kind, (model, column) in _COUNTER_TOTALS.items():
+        folded = (
+            delete(CounterShard)
+            .where(CounterShard.kind == kind)
+            .returning(CounterShard.owner_id, CounterShard.value)
+            .cte("folded")
+        )
+        totals = (
+            select(folded.c.owner_id, func.sum(folded.c.value).label("total"))
+            .group_by(folded.c.owner_id)
+            .cte("totals")
+        )
+        result = await db.execute(
+            update(model)
+            .where(model.id == totals.c.owner_id, totals.c.total != 0)
+            .values({column: func.coalesce(column, 0) + totals.c.total})
+            .returning(model.id)
+            .execution_options(synchronize_session=False)
+        )
+        if kind == GROUP_COLLECTORS:
+            group_ids = result.scalars().all()
+    await db.commit()
+    return group_ids
+
+
+async def reconcile_counters(db: AsyncSession) -> None:
+    """
+    Пересчитать итоговые счётчики по исходным данным и очистить шарды.
+
+    На время пересчёта таблица шардов блокируется от записи, поэтому
+    заявки и изменения сборщиков ждут окончания транзакции, а чтение
+    коллекторов и групп не блокируется.
+    """
+    await db.execute(text("LOCK TABLE counter_shards IN EXCLUSIVE MODE"))
+    await db.execute(delete(CounterShard))
+    await db.execute(
+        update(Collector).values(count_leads=(
+            select(func.count())
+            .where(CollectorLead.collector_id == Collector.id, CollectorLead.request_form == True)
+            .scalar_subquery()
+        ))
+    )
+    await db.execute(
+        update(Group).values(collector_count=(
+            select(func.count())
+            .where(Collector.group_id == Group.id)
+            .scalar_subquery()
+        ))
+    )
+    await db.commit()
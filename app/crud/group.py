@@ -1,43 +1,71 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, delete
+from sqlalchemy import insert, update, delete
+from sqlalchemy.engine import Row
+from app.core.config import settings
 from app.models.group import Group
-from app.schemas.group import GroupCreate, GroupRead
+from app.schemas.group import GroupCreate
+from app.utils.cache import TTLCache
+from typing import Optional
+
+# Кэш групп по vk_id: зависимость авторизации резолвит группу на каждый запрос
+_groups_by_vk_id = TTLCache(maxsize=settings.group_cache_size, ttl=settings.group_cache_ttl)
+
+
+def invalidate_group_cache(group_id: int) -> None:
+    """
+    Удалить из кэша группу с указанным ID.
+    """
+    _groups_by_vk_id.discard_if(lambda vk_id, group: group.id == group_id)
+
+# Колонки GroupRead: crud возвращает строки с ними, проверяет их response_model эндпоинта
+GROUP_READ_COLUMNS = (Group.id, Group.vk_id, Group.collector_count)
 
 # Create
-async def create_group(db: AsyncSession, group_data: GroupCreate) -> GroupRead:
-    group = Group(vk_id=group_data.vk_id)
-    db.add(group)
+async def create_group(db: AsyncSession, group_data: GroupCreate) -> Row:
+    result = await db.execute(
+        insert(Group).values(vk_id=group_data.vk_id).returning(*GROUP_READ_COLUMNS)
+    )
+    group = result.one()
     await db.commit()
-    await db.refresh(group)
-    return GroupRead.model_validate(group)
+    _groups_by_vk_id.pop(group.vk_id)
+    return group
 
 # Read by ID
-async def get_group_by_id(db: AsyncSession, group_id: int) -> GroupRead:
-    result = await db.execute(select(Group).filter(Group.id == group_id))
-    group = result.scalars().first()
-    return GroupRead.model_validate(group) if group else None
+async def get_group_by_id(db: AsyncSession, group_id: int) -> Optional[Row]:
+    result = await db.execute(select(*GROUP_READ_COLUMNS).filter(Group.id == group_id))
+    return result.first()
 
 # Read by VK ID
-async def get_group_by_vk_id(db: AsyncSession, vk_id: str) -> GroupRead:
-    result = await db.execute(select(Group).filter(Group.vk_id == vk_id))
-    group = result.scalars().first()
-    return GroupRead.model_validate(group) if group else None
+async def get_group_by_vk_id(db: AsyncSession, vk_id: str) -> Optional[Row]:
+    cached = _groups_by_vk_id.get(vk_id)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(select(*GROUP_READ_COLUMNS).filter(Group.vk_id == vk_id))
+    group = result.first()
+    if not group:
+        return None
+
+    _groups_by_vk_id.set(vk_id, group)
+    return group
 
 # Update
-async def update_group(db: AsyncSession, group_id: int, group_data: GroupCreate) -> GroupRead:
+async def update_group(db: AsyncSession, group_id: int, group_data: GroupCreate) -> Optional[Row]:
     result = await db.execute(
         update(Group)
         .where(Group.id == group_id)
         .values(vk_id=group_data.vk_id, phone=group_data.phone)
-        .returning(Group)
+        .returning(*GROUP_READ_COLUMNS)
     )
-    group = result.scalar_one_or_none()
+    group = result.first()
     await db.commit()
-    return GroupRead.model_validate(group) if group else None
+    invalidate_group_cache(group_id)
+    return group
 
 # Delete
 async def delete_group(db: AsyncSession, group_id: int) -> bool:
     result = await db.execute(delete(Group).where(Group.id == group_id))
     await db.commit()
+    invalidate_group_cache(group_id)
     return result.rowcount > 0
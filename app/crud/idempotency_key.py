@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from app.models.idempotency_key import IdempotencyKey
+
+
+# Занять ключ под выполняемый запрос. Ключ занимается, если его ещё нет,
+# если он устарел или если выполнявший его запрос не завершился за pending_timeout.
+# Возвращает None, если ключ занят этим вызовом, иначе сохранённую
+# по ключу тройку (хэш запроса, статус, тело), статус None - запрос ещё выполняется
+async def reserve_idempotency_key(
+        db: AsyncSession,
+        key: str,
+        request_hash: str,
+        max_age: timedelta,
+        pending_timeout: timedelta
+) -> Optional[Tuple[str, Optional[int], Optional[bytes]]]:
+    now = datetime.utcnow()
+    reserved = (await db.execute(
+        insert(IdempotencyKey)
+        .values(key=key, request_hash=request_hash, status_code=None, body=None, created_at=now)
+        .on_conflict_do_update(
+            index_elements=[IdempotencyKey.key],
+            set_={"request_hash": request_hash, "status_code": None, "body": None, "created_at": now},
+            where=or_(
+                IdempotencyKey.created_at < now - max_age,
+                and_(IdempotencyKey.status_code.is_(None), IdempotencyKey.created_at < now - pending_timeout)
+            )
+        )
+        .returning(IdempotencyKey.key)
+    )).first()
+    if reserved is not None:
+        await db.commit()
+        return None
+
+    row = (await db.execute(
+        select(IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.body)
+        .where(IdempotencyKey.key == key)
+    )).first()
+    await db.commit()
+    # Строку могли удалить между запросами, если выполнявший запрос упал
+    return (row.request_hash, row.status_code, row.body) if row else (request_hash, None, None)
+
+
+# Сохранение ответа по занятому ключу
+async def save_idempotent_response(db: AsyncSession, key: str, status_code: int, body: bytes) -> None:
+    await db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(status_code=status_code, body=body)
+    )
+    await db.commit()
+
+
+# Освобождение ключа, если запрос завершился без сохранённого ответа
+async def release_idempotency_key(db: AsyncSession, key: str) -> None:
+    await db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+    )
+    await db.commit()
+
+
+# Удаление устаревших ключей
+async def delete_expired_idempotency_keys(db: AsyncSession, max_age: timedelta) -> int:
+    result = await db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.created_at < datetime.utcnow() - max_age)
+    )
+    await db.commit()
+    return result.rowcount
@@ -1,236 +1,482 @@
+import random
+import re
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, func, distinct, delete
+from sqlalchemy import select, update, func, distinct, delete, union_all, literal, true, false, values, column, String, Integer, text, tuple_, or_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Row
 from datetime import datetime, timedelta
+from app.core.config import settings
+from app.crud.counter import COLLECTOR_LEADS, increment_counter, increment_counter_statement
+from app.crud.collector_stats import UNKNOWN_HOUR, record_stats_statement, stats_hour
 from app.models.collector import Collector
 from app.models.combined import CollectorLead
-from app.schemas.analytics import CollectorAnalytics
 from app.models.lead import Lead
-from typing import Optional, List
-from app.schemas.lead import LeadRead
-from app.utils.get_user_vk import get_user_full_name, get_user_info
+from app.models.vk_profile import VkProfile
+from typing import Any, Dict, Optional, List, Iterable, Tuple, AsyncIterator
+from app.schemas.lead import LeadImportResult
+from app.utils.lead_io import IMPORT_COLUMNS
+from app.utils.pagination import decode_lead_cursor, decode_lead_rank_cursor, encode_lead_cursor, encode_lead_rank_cursor
+from app.utils.analytics_cache import invalidate_collector_analytics
+from app.workers.lead_enrichment import lead_enrichment
+
+
+def placeholder_full_name(vk_id: str) -> str:
+    """
+    Имя-заглушка для нового лида до получения профиля из VK.
+    """
+    return f"id{vk_id}"
+
 
 # Создание записи о переходе лида
-async def create_lead_visit(db: AsyncSession, vk_id: str, collector_id: int) -> Optional[CollectorLead]:
-    # Получаем или создаем лида
-    lead = await get_or_create_lead(db, vk_id)
-    if not lead:
-        # Если создание лида не удалось, возвращаем None
-        return None
+async def create_lead_visit(db: AsyncSession, vk_id: str, collector_id: int) -> Optional[Row]:
+    """
+    Создать лида (если его ещё нет) и запись о его переходе на коллектор.
 
-    # Проверяем, существует ли запись в CollectorLead для данного collector_id и lead_id
-    existing_lead = await db.scalar(
-        select(CollectorLead).where(
-            CollectorLead.collector_id == collector_id,
-            CollectorLead.lead_id == lead.id
-        )
+    Всё выполняется одним запросом INSERT ... ON CONFLICT ... RETURNING:
+    лид и переход вставляются, только если их ещё нет, а запрос в любом
+    случае возвращает данные лида. Новый переход в том же запросе
+    учитывается в часовой корзине collector_stats_hourly.
+
+    :param db: Асинхронная сессия базы данных.
+    :param vk_id: VK ID лида.
+    :param collector_id: ID коллектора.
+    :return: Строка лида с полями LeadRead или None, если коллектор не существует.
+    """
+    inserted_lead = (
+        insert(Lead)
+        .values(vk_id=vk_id, full_name=placeholder_full_name(vk_id))
+        .on_conflict_do_nothing(index_elements=[Lead.vk_id])
+        .returning(Lead.id, Lead.phone, Lead.vk_id, Lead.full_name)
+        .cte("inserted_lead")
     )
-    
-    if existing_lead:
-        # Если запись уже существует, просто возвращаем её, ничего не изменяя
-        lead_result = await db.scalar(
-            select(Lead).where(Lead.id == lead.id)
+    # Если лид уже был, INSERT ничего не вернёт, и строку отдаст SELECT.
+    # Только что вставленную строку SELECT не видит, поэтому дублей нет
+    lead = union_all(
+        select(inserted_lead, literal(True).label("created")),
+        select(Lead.id, Lead.phone, Lead.vk_id, Lead.full_name, literal(False).label("created"))
+        .where(Lead.vk_id == vk_id)
+    ).cte("lead")
+    now = datetime.utcnow()
+    visit = (
+        insert(CollectorLead)
+        .from_select(
+            ["collector_id", "lead_id", "checked_form", "request_form", "datetime_visit"],
+            select(literal(collector_id), lead.c.id, true(), false(), literal(now))
         )
-        return lead_result
-
-    # Создаем новую запись в CollectorLead с checked_form=True
-    new_lead = CollectorLead(
-        collector_id=collector_id,
-        lead_id=lead.id,
-        checked_form=True,
-        request_form=False,
-        datetime_request=None
+        .on_conflict_do_nothing(index_elements=[CollectorLead.collector_id, CollectorLead.lead_id])
+        .returning(CollectorLead.collector_id)
+        .cte("visit")
     )
-    db.add(new_lead)
+    stats = record_stats_statement(
+        select(visit.c.collector_id, literal(stats_hour(now)), literal(1), literal(0))
+    ).cte("stats")
+    statement = select(lead).add_cte(visit, stats)
+
     try:
+        row = (await db.execute(statement)).first()
+        if row is None:
+            # Лида с тем же vk_id параллельно вставил другой запрос:
+            # повторяем запрос, теперь SELECT увидит его строку
+            row = (await db.execute(statement)).first()
         await db.commit()
     except IntegrityError:
         await db.rollback()
         return None
-    await db.refresh(new_lead)
-    
-    lead_result = await db.scalar(
-        select(Lead).where(Lead.id == new_lead.lead_id)
-    )
-    
-    return lead_result
 
-# Обновление записи лида при отправке заявки
-async def submit_lead_request(db: AsyncSession, vk_id: str, collector_id: int) -> Optional[CollectorLead]:
-    # Сначала ищем лида по vk_id
-    lead = await db.scalar(
-        select(Lead).where(Lead.vk_id == vk_id)
-    )
-    
-    if not lead:
+    if row is None:
         return None
+    if row.created:
+        lead_enrichment.enqueue(vk_id)
 
-    # Загружаем CollectorLead с предварительной загрузкой связанных данных
-    collector_lead = await db.scalar(
-        select(CollectorLead)
-        .options(selectinload(CollectorLead.lead))
-        .where(
-            CollectorLead.collector_id == collector_id,
-            CollectorLead.lead_id == lead.id
-        )
-    )
+    return row
 
-    if collector_lead and not collector_lead.request_form:
-        # Обновляем запись
-        collector_lead.request_form = True
-        collector_lead.datetime_request = datetime.utcnow()
-        
-        collector = await db.scalar(
-            select(Collector)
-            .where(
-                Collector.id == collector_id
-            )
-        )
-        collector.count_leads += 1
 
-        
-        await db.commit()
-        await db.refresh(collector_lead)
-        return collector_lead
+async def record_lead_visits(db: AsyncSession, visits: Iterable[Tuple[str, int]]) -> int:
+    """
+    Записать пачку переходов лидов многострочными INSERT ... ON CONFLICT.
 
-    return None
+    Используется буферизованным приёмом переходов: сначала одним запросом
+    создаются отсутствующие лиды, затем одним запросом - записи о переходах
+    и их учёт в часовых корзинах collector_stats_hourly.
+    Уже записанные переходы и переходы на удалённые коллекторы пропускаются.
 
+    :param db: Асинхронная сессия базы данных.
+    :param visits: Пары (vk_id, collector_id).
+    :return: Количество новых записей о переходах.
+    """
+    visits = set(visits)
+    if not visits:
+        return 0
+
+    batch = values(
+        column("vk_id", String), column("collector_id", Integer), column("full_name", String), name="batch"
+    ).data([(vk_id, collector_id, placeholder_full_name(vk_id)) for vk_id, collector_id in sorted(visits)])
+    # Лиды создаются только для существующих коллекторов. Сортировка задаёт
+    # одинаковый порядок блокировок строк при параллельной записи из разных процессов
+    created_vk_ids = (await db.scalars(
+        insert(Lead)
+        .from_select(
+            ["vk_id", "full_name"],
+            select(batch.c.vk_id, batch.c.full_name)
+            .distinct()
+            .join(Collector, Collector.id == batch.c.collector_id)
+            .order_by(batch.c.vk_id)
+        )
+        .on_conflict_do_nothing(index_elements=[Lead.vk_id])
+        .returning(Lead.vk_id)
+    )).all()
+
+    now = datetime.utcnow()
+    inserted = (
+        insert(CollectorLead)
+        .from_select(
+            ["collector_id", "lead_id", "checked_form", "request_form", "datetime_visit"],
+            select(Collector.id, Lead.id, true(), false(), literal(now))
+            .select_from(batch)
+            .join(Lead, Lead.vk_id == batch.c.vk_id)
+            .join(Collector, Collector.id == batch.c.collector_id)
+        )
+        .on_conflict_do_nothing(index_elements=[CollectorLead.collector_id, CollectorLead.lead_id])
+        .returning(CollectorLead.collector_id)
+        .cte("inserted")
+    )
+    stats = record_stats_statement(
+        select(inserted.c.collector_id, literal(stats_hour(now)), func.count(), literal(0))
+        .group_by(inserted.c.collector_id)
+        .order_by(inserted.c.collector_id)
+    ).cte("stats")
+    visits_recorded = await db.scalar(select(func.count()).select_from(inserted).add_cte(stats))
+    await db.commit()
 
-# Получение аналитики для коллектора
-async def get_collector_analytics(db: AsyncSession, collector_id: int, period: str) -> CollectorAnalytics:
-    # Определение временного диапазона для анализа
-    start_date = datetime.utcnow() - {
-        "day": timedelta(days=1),
-        "week": timedelta(weeks=1),
-        "month": timedelta(days=30)
-    }.get(period, timedelta(days=1))
+    for vk_id in created_vk_ids:
+        lead_enrichment.enqueue(vk_id)
+    return visits_recorded
 
-    # Подсчет количества лидов и просмотров
-    leads_count = await db.scalar(
-        select(func.count(CollectorLead.lead_id))
-        .where(
-            CollectorLead.collector_id == collector_id,
-            CollectorLead.request_form == True,
-            CollectorLead.datetime_request >= start_date
-        )
+async def import_leads(db: AsyncSession, collector_id: int, records: AsyncIterator[Tuple]) -> LeadImportResult:
+    """
+    Загрузить лидов из файла импорта в коллектор.
+
+    Записи копируются через COPY во временную таблицу по мере чтения файла,
+    затем набором запросов сливаются в leads и collector_lead. Имена из VK
+    не запрашиваются: профили новых лидов загрузит VkProfileRefresher.
+    Существующие лиды и переходы не перезаписываются, кроме пустого телефона
+    и ещё не отправленной заявки. Счётчик заявок коллектора увеличивается
+    один раз в конце. Переходы и заявки учитываются в часовых корзинах
+    по времени заявки из файла. Переходы без заявки не имеют времени
+    и попадают в корзину UNKNOWN_HOUR. Час корзины сохраняется как время
+    перехода, чтобы удаление лида уменьшило ту же корзину.
+    Всё выполняется в одной транзакции.
+
+    :param db: Асинхронная сессия базы данных.
+    :param collector_id: ID коллектора.
+    :param records: Записи в порядке колонок IMPORT_COLUMNS.
+    :return: Итоги импорта.
+    """
+    rows = 0
+
+    async def with_placeholders():
+        nonlocal rows
+        async for vk_id, phone, full_name, request_form, datetime_request in records:
+            rows += 1
+            yield vk_id, phone, full_name or placeholder_full_name(vk_id), request_form, datetime_request
+
+    await db.execute(text(
+        "CREATE TEMP TABLE lead_import ("
+        "vk_id VARCHAR NOT NULL, phone VARCHAR, full_name VARCHAR NOT NULL, "
+        "request_form BOOLEAN NOT NULL, datetime_request TIMESTAMP"
+        ") ON COMMIT DROP"
+    ))
+    connection = await (await db.connection()).get_raw_connection()
+    await connection.driver_connection.copy_records_to_table(
+        "lead_import", records=with_placeholders(), columns=IMPORT_COLUMNS
     )
 
-    visit_count = await db.scalar(
-        select(func.count(CollectorLead.lead_id))
-        .where(
-            CollectorLead.collector_id == collector_id,
-            CollectorLead.checked_form == True,
-            CollectorLead.datetime_request >= start_date
-        )
+    # Одна запись на vk_id: заявка важнее простого перехода
+    await db.execute(text(
+        "CREATE TEMP TABLE staged_leads ON COMMIT DROP AS "
+        "SELECT DISTINCT ON (vk_id) vk_id, phone, full_name, request_form, datetime_request "
+        "FROM lead_import ORDER BY vk_id, request_form DESC, datetime_request"
+    ))
+    leads_created = len((await db.execute(text(
+        "INSERT INTO leads (vk_id, phone, full_name) "
+        "SELECT vk_id, phone, full_name FROM staged_leads ORDER BY vk_id "
+        "ON CONFLICT (vk_id) DO NOTHING RETURNING id"
+    ))).all())
+    await db.execute(text(
+        "UPDATE leads SET phone = s.phone FROM staged_leads s "
+        "WHERE leads.vk_id = s.vk_id AND leads.phone IS NULL AND s.phone IS NOT NULL"
+    ))
+    # Строки, вставленные INSERT ... ON CONFLICT, отличаются от обновлённых
+    # по xmax = 0: обновлённые строки уже были переходами и в корзине
+    # учитывается только их заявка
+    visits = (await db.execute(
+        text(
+            "WITH visits AS ("
+            "INSERT INTO collector_lead (collector_id, lead_id, checked_form, request_form, datetime_request, datetime_visit) "
+            "SELECT CAST(:collector_id AS INTEGER), l.id, true, s.request_form, "
+            "CASE WHEN s.request_form THEN coalesce(s.datetime_request, CAST(:now AS TIMESTAMP)) END, "
+            "CASE WHEN s.request_form THEN coalesce(s.datetime_request, CAST(:now AS TIMESTAMP)) "
+            "ELSE CAST(:unknown_hour AS TIMESTAMP) END "
+            "FROM staged_leads s JOIN leads l ON l.vk_id = s.vk_id "
+            "ON CONFLICT (collector_id, lead_id) DO UPDATE "
+            "SET request_form = true, datetime_request = excluded.datetime_request "
+            "WHERE collector_lead.request_form IS NOT true AND excluded.request_form "
+            "RETURNING collector_id, request_form, datetime_request, xmax = 0 AS created"
+            "), stats AS ("
+            "INSERT INTO collector_stats_hourly (collector_id, hour, visits, submissions, shard) "
+            "SELECT collector_id, date_trunc('hour', coalesce(datetime_request, CAST(:unknown_hour AS TIMESTAMP))), "
+            "count(*) FILTER (WHERE created), count(*) FILTER (WHERE request_form), CAST(:shard AS SMALLINT) "
+            "FROM visits GROUP BY 1, 2 "
+            "ON CONFLICT (collector_id, hour, shard) DO UPDATE "
+            "SET visits = collector_stats_hourly.visits + excluded.visits, "
+            "submissions = collector_stats_hourly.submissions + excluded.submissions"
+            ") "
+            "SELECT request_form FROM visits"
+        ),
+        {
+            "collector_id": collector_id,
+            "now": datetime.utcnow(),
+            "unknown_hour": UNKNOWN_HOUR,
+            "shard": random.randrange(settings.counter_shard_count)
+        }
+    )).scalars().all()
+
+    requests_added = sum(visits)
+    if requests_added:
+        await increment_counter(db, COLLECTOR_LEADS, collector_id, requests_added)
+    await db.commit()
+    if requests_added:
+        invalidate_collector_analytics(collector_id)
+
+    return LeadImportResult(
+        rows=rows,
+        leads_created=leads_created,
+        visits_recorded=len(visits),
+        requests_added=requests_added
     )
 
-    # Расчет коэффициента конверсии (CR)
-    conversion_rate = (leads_count / visit_count * 100) if visit_count else 0.0
 
-    return CollectorAnalytics(
-        collector_id=collector_id,
-        leads_count=leads_count,
-        visit_count=visit_count,
-        conversion_rate=conversion_rate
-    )
+# Обновление записи лида при отправке заявки
+async def submit_lead_request(
+    db: AsyncSession,
+    vk_id: str,
+    collector_id: int,
+    phone: Optional[str] = None
+) -> Optional[Row]:
+    """
+    Отметить отправку заявки лидом одним запросом.
 
+    Один запрос с CTE отмечает заявку в collector_lead, сохраняет телефон
+    лида, увеличивает случайные шарды счётчика заявок коллектора и часовой
+    корзины collector_stats_hourly на стороне базы, поэтому параллельные
+    заявки не теряют инкременты и не ждут блокировку одной строки
+    коллектора или корзины.
 
-# Проверка на существование лида и создание нового, если его нет
-async def get_or_create_lead(db: AsyncSession, vk_id: str) -> Lead:
-    # Ищем лида с заданным vk_id
-    existing_lead = await db.scalar(
-        select(Lead).where(Lead.vk_id == vk_id)
+    :param db: Асинхронная сессия базы данных.
+    :param vk_id: VK ID лида.
+    :param collector_id: ID коллектора.
+    :param phone: Телефон лида. Если не передан, сохранённый телефон не меняется.
+    :return: Строка обновлённой записи о переходе с полями CollectorLeadRead
+        или None, если перехода нет
+        или заявка уже отправлена.
+    """
+    now = datetime.utcnow()
+    submitted = (
+        update(CollectorLead)
+        .where(
+            CollectorLead.collector_id == collector_id,
+            CollectorLead.lead_id == select(Lead.id).where(Lead.vk_id == vk_id).scalar_subquery(),
+            CollectorLead.request_form.isnot(True)
+        )
+        .values(request_form=True, datetime_request=now)
+        .returning(
+            CollectorLead.collector_id,
+            CollectorLead.lead_id,
+            CollectorLead.checked_form,
+            CollectorLead.request_form,
+            CollectorLead.datetime_request
+        )
+        .cte("submitted")
     )
+    counter = increment_counter_statement(COLLECTOR_LEADS, select(submitted.c.collector_id)).cte("counter")
+    stats = record_stats_statement(
+        select(submitted.c.collector_id, literal(stats_hour(now)), literal(0), literal(1))
+    ).cte("stats")
+    statement = select(submitted).add_cte(counter, stats)
+    if phone is not None:
+        statement = statement.add_cte(
+            update(Lead)
+            .where(Lead.id.in_(select(submitted.c.lead_id)))
+            .values(phone=phone)
+            .cte("lead_phone")
+        )
 
-    if existing_lead:
-        # Если такой лид уже существует, возвращаем его
-        return existing_lead
+    row = (await db.execute(statement)).first()
+    await db.commit()
 
-    # Если лида с таким vk_id нет, создаем новый объект Lead
-    new_lead = Lead(
-        vk_id=vk_id,
-        full_name=get_user_full_name(vk_id),
-        phone=None  # Поле phone пока оставляем пустым
-    )
-    db.add(new_lead)
-    try:
-        await db.commit()
-    except IntegrityError:
-        await db.rollback()
+    if row is None:
         return None
-    await db.refresh(new_lead)
-    return new_lead
+    invalidate_collector_analytics(collector_id)
+    return row
 
 
-async def update_lead(db: AsyncSession, phone: str, vk_id: str) -> Lead:
-    updated_lead = await db.execute(
-        update(Lead)
-        .where(Lead.vk_id == vk_id)
-        .values(phone=phone)
-    )
-    
-    await db.commit()
+def lead_search_condition(search: str):
+    """
+    Условие поиска лида по подстроке имени или цифрам телефона.
 
-    new_lead = await db.scalar(
-        select(Lead)
-        .where(Lead.vk_id == vk_id)
-    )
+    ILIKE по full_name и LIKE по phone_normalized используют триграммные
+    GIN-индексы. Спецсимволы LIKE в запросе экранируются.
+    """
+    def pattern(term: str) -> str:
+        return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
 
-    return new_lead
+    condition = Lead.full_name.ilike(pattern(search), escape="\\")
+    digits = re.sub(r"\D", "", search)
+    if digits:
+        condition = or_(condition, Lead.phone_normalized.like(pattern(digits), escape="\\"))
+    return condition
 
 
 async def get_leads_by_collector(
-    db: AsyncSession, collector_id: int, search: Optional[str] = None
-) -> List[LeadRead]:
+    db: AsyncSession,
+    collector_id: int,
+    search: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    rank: bool = False
+) -> Dict[str, Any]:
     """
-    Получить список лидов для указанного коллектора, которые оставили заявку,
+    Получить страницу лидов указанного коллектора, которые оставили заявку,
     с информацией о фото.
+    Фото берётся из таблицы vk_profiles, без обращений к VK.
+
+    Лиды отсортированы от новых заявок к старым, по (datetime_request, lead_id).
+    Страницы выбираются по курсору (keyset) через индекс
+    ix_collector_lead_requests, поэтому любая страница стоит как первая.
+    Заявки без времени идут в конце списка.
+
+    Поиск ищет подстроку в имени и цифры в нормализованном телефоне
+    через триграммные GIN-индексы (pg_trgm). С rank=True результаты поиска
+    сортируются по похожести имени на запрос, и курсор страницы - позиция
+    по (похожесть, lead_id).
+
+    :param db: Асинхронная сессия базы данных.
+    :param collector_id: ID коллектора.
+    :param search: Поисковый запрос по имени или телефону.
+    :param limit: Размер страницы.
+    :param cursor: Курсор из next_cursor предыдущей страницы.
+    :param rank: Сортировать результаты поиска по похожести.
+    :return: Страница лидов в виде LeadPage: строки лидов в items
+        и курсор следующей страницы в next_cursor.
+    :raises ValueError: Если курсор повреждён.
+    """
+    ranked = bool(search and rank)
+    after = None
+    if cursor:
+        after = decode_lead_rank_cursor(cursor) if ranked else decode_lead_cursor(cursor)
+    search_conditions = [lead_search_condition(search)] if search else []
+
+    def page_query(*conditions):
+        return (
+            select(
+                Lead.id,
+                Lead.phone,
+                Lead.vk_id,
+                Lead.full_name,
+                VkProfile.photo_url.label("photo"),
+                CollectorLead.datetime_request
+            )
+            .join(Lead.collector_leads)
+            .outerjoin(VkProfile, VkProfile.vk_id == Lead.vk_id)
+            .filter(
+                CollectorLead.collector_id == collector_id,
+                CollectorLead.request_form == True,  # Добавляем фильтр только для оставивших заявку
+                *search_conditions,
+                *conditions
+            )
+            .order_by(CollectorLead.datetime_request.desc().nullslast(), CollectorLead.lead_id.desc())
+        )
+
+    # Заявки со временем и без него выбираются отдельными частями, чтобы
+    # условие по курсору в каждой части оставалось сравнением по индексу
+    dated = CollectorLead.datetime_request.isnot(None)
+    undated = CollectorLead.datetime_request.is_(None)
+    if ranked:
+        similarity = func.word_similarity(search, Lead.full_name)
+        conditions = [tuple_(similarity, CollectorLead.lead_id) < tuple_(*after)] if after else []
+        parts = [
+            page_query(*conditions)
+            .add_columns(similarity)
+            .order_by(None)
+            .order_by(similarity.desc(), CollectorLead.lead_id.desc())
+        ]
+    elif after is None:
+        parts = [page_query(dated), page_query(undated)]
+    elif after[0] is not None:
+        parts = [
+            page_query(dated, tuple_(CollectorLead.datetime_request, CollectorLead.lead_id) < tuple_(*after)),
+            page_query(undated)
+        ]
+    else:
+        parts = [page_query(undated, CollectorLead.lead_id < after[1])]
+
+    # Лишняя строка показывает, что следующая страница есть
+    rows = []
+    for query in parts:
+        rows += (await db.execute(query.limit(limit + 1 - len(rows)))).all()
+        if len(rows) > limit:
+            break
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if ranked:
+            next_cursor = encode_lead_rank_cursor(last[-1], last.id)
+        else:
+            next_cursor = encode_lead_cursor(last.datetime_request, last.id)
+
+    # Строки отдаются как есть: по LeadPage их проверяет response_model эндпоинта
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+async def iter_lead_export(
+    db: AsyncSession, collector_id: int, requests_only: bool = True, batch_size: int = 1000
+) -> AsyncIterator[List[Tuple]]:
+    """
+    Пачки строк выгрузки лидов коллектора в порядке колонок EXPORT_COLUMNS.
+
+    Строки читаются серверным курсором по batch_size штук, поэтому память
+    не зависит от числа лидов.
 
     :param db: Асинхронная сессия базы данных.
     :param collector_id: ID коллектора.
-    :param search: Поисковый запрос для фильтрации по имени.
-    :return: Список лидов с информацией о фото.
+    :param requests_only: Выгружать только лидов, отправивших заявку.
+    :param batch_size: Количество строк в пачке.
     """
     query = (
-        select(Lead)
-        .join(Lead.collector_leads)
-        .filter(
-            CollectorLead.collector_id == collector_id,
-            CollectorLead.request_form == True  # Добавляем фильтр только для оставивших заявку
+        select(
+            Lead.vk_id,
+            Lead.full_name,
+            Lead.phone,
+            VkProfile.photo_url,
+            CollectorLead.request_form,
+            CollectorLead.datetime_request
         )
-        .options(selectinload(Lead.collector_leads))
-        .distinct()
+        .join(CollectorLead, CollectorLead.lead_id == Lead.id)
+        .outerjoin(VkProfile, VkProfile.vk_id == Lead.vk_id)
+        .where(CollectorLead.collector_id == collector_id)
+        .order_by(Lead.id)
+        .execution_options(yield_per=batch_size)
     )
-    if search:
-        query = query.filter(Lead.full_name.ilike(f"%{search}%"))
-
-    result = await db.execute(query)
-    leads = result.scalars().all()
-
-    enriched_leads = []
-    for lead in leads:
-        try:
-            vk_info = await get_user_info(lead.vk_id)
-            lead_data = LeadRead.model_validate({
-                "id": lead.id,
-                "phone": lead.phone,
-                "vk_id": lead.vk_id,
-                "full_name": lead.full_name,
-                "photo": vk_info.get("photo_200"),
-            })
-            enriched_leads.append(lead_data)
-        except RuntimeError:
-            lead_data = LeadRead.model_validate({
-                "id": lead.id,
-                "phone": lead.phone,
-                "vk_id": lead.vk_id,
-                "full_name": lead.full_name,
-                "photo": None,
-            })
-            enriched_leads.append(lead_data)
-
-    return enriched_leads
+    if requests_only:
+        query = query.where(CollectorLead.request_form == True)
+
+    result = await db.stream(query)
+    async for rows in result.partitions():
+        yield [tuple(row) for row in rows]
 
 
 async def delete_lead(collector_id: int, vk_id: str, db: AsyncSession) -> bool:
@@ -242,29 +488,52 @@ async def delete_lead(collector_id: int, vk_id: str, db: AsyncSession) -> bool:
     :param db: Асинхронная сессия базы данных.
     :return: True, если запись была удалена, иначе False.
     """
-    # Извлекаем lead_id из таблицы Leads
-    result = await db.execute(
-        select(Lead.id).where(Lead.vk_id == vk_id)
-    )
-    lead = result.scalar_one_or_none()
-
-    if not lead:
-        # Если лида с таким vk_id не существует
-        return False
-
-    # Удаляем запись из таблицы CollectorLead
-    delete_result = await db.execute(
-        delete(CollectorLead).where(
+    # Удаляем запись из CollectorLead и в том же запросе уменьшаем счётчик
+    # заявок коллектора, если лид отправлял заявку, и часовые корзины
+    # перехода и заявки, в которые запись попала при учёте
+    deleted = (
+        delete(CollectorLead)
+        .where(
             CollectorLead.collector_id == collector_id,
-            CollectorLead.lead_id == lead  # Используем lead_id, найденный ранее
+            CollectorLead.lead_id == select(Lead.id).where(Lead.vk_id == vk_id).scalar_subquery()
         )
+        .returning(
+            CollectorLead.collector_id,
+            CollectorLead.request_form,
+            CollectorLead.datetime_request,
+            CollectorLead.datetime_visit
+        )
+        .cte("deleted")
     )
-    
-    collector = await db.scalar(
-        select(Collector)
-        .where(Collector.id == collector_id)
-    )
-    collector.count_leads -= 1
-    
+    counter = increment_counter_statement(
+        COLLECTOR_LEADS,
+        select(deleted.c.collector_id).where(deleted.c.request_form == True),
+        delta=-1
+    ).cte("counter")
+    events = union_all(
+        select(
+            deleted.c.collector_id,
+            func.date_trunc(
+                "hour", func.coalesce(deleted.c.datetime_visit, UNKNOWN_HOUR)
+            ).label("hour"),
+            literal(-1).label("visits"),
+            literal(0).label("submissions")
+        ),
+        select(
+            deleted.c.collector_id,
+            func.date_trunc("hour", func.coalesce(deleted.c.datetime_request, UNKNOWN_HOUR)),
+            literal(0),
+            literal(-1)
+        ).where(deleted.c.request_form == True)
+    ).subquery("events")
+    stats = record_stats_statement(
+        select(events.c.collector_id, events.c.hour, func.sum(events.c.visits), func.sum(events.c.submissions))
+        .group_by(events.c.collector_id, events.c.hour)
+    ).cte("stats")
+    row = (await db.execute(select(deleted.c.collector_id).add_cte(counter, stats))).first()
+
     await db.commit()
-    return delete_result.rowcount > 0
+    if row is None:
+        return False
+    invalidate_collector_analytics(collector_id)
+    return True
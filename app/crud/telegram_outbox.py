@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Row, insert, select, update
+from app.models.telegram_outbox import TelegramOutbox
+
+
+# Постановка сообщений в очередь на отправку
+async def enqueue_telegram_messages(db: AsyncSession, message: str, chat_ids: List[str]) -> None:
+    now = datetime.utcnow()
+    await db.execute(
+        insert(TelegramOutbox),
+        [
+            {"chat_id": str(chat_id), "message": message, "status": "pending", "attempts": 0,
+             "next_attempt_at": now, "created_at": now}
+            for chat_id in chat_ids
+        ]
+    )
+    await db.commit()
+
+
+# Захват сообщений, которые пора отправить
+async def claim_due_telegram_messages(db: AsyncSession, limit: int, lease: timedelta) -> List[Row]:
+    """
+    Захватить пачку сообщений, готовых к отправке.
+
+    Строки блокируются через FOR UPDATE SKIP LOCKED, а next_attempt_at
+    сдвигается на время аренды, поэтому несколько воркеров не отправят
+    одно сообщение дважды, а сообщения упавшего воркера вернутся в очередь.
+
+    :param db: Асинхронная сессия базы данных.
+    :param limit: Максимальное количество сообщений.
+    :param lease: Время, на которое сообщение скрывается от других воркеров.
+    :return: Строки (id, chat_id, message, attempts) захваченных сообщений.
+    """
+    now = datetime.utcnow()
+    due = (
+        select(TelegramOutbox.id)
+        .where(TelegramOutbox.status == "pending", TelegramOutbox.next_attempt_at <= now)
+        .order_by(TelegramOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(TelegramOutbox)
+        .where(TelegramOutbox.id.in_(due.scalar_subquery()))
+        .values(attempts=TelegramOutbox.attempts + 1, next_attempt_at=now + lease)
+        .returning(TelegramOutbox.id, TelegramOutbox.chat_id, TelegramOutbox.message, TelegramOutbox.attempts)
+        .execution_options(synchronize_session=False)
+    )
+    messages = list(result.all())
+    await db.commit()
+    return messages
+
+
+async def mark_telegram_message_sent(db: AsyncSession, message_id: int) -> None:
+    await db.execute(
+        update(TelegramOutbox)
+        .where(TelegramOutbox.id == message_id)
+        .values(status="sent", sent_at=datetime.utcnow(), last_error=None)
+    )
+
+
+async def reschedule_telegram_message(
+    db: AsyncSession, message_id: int, delay: timedelta, error: str, give_up: bool = False
+) -> None:
+    await db.execute(
+        update(TelegramOutbox)
+        .where(TelegramOutbox.id == message_id)
+        .values(
+            status="failed" if give_up else "pending",
+            next_attempt_at=datetime.utcnow() + delay,
+            last_error=error
+        )
+    )
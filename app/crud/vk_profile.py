@@ -0,0 +1,143 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from app.models.lead import Lead
+from app.models.vk_profile import VkProfile
+from app.utils.get_user_vk import VKUserNotFound, get_user_info
+
+
+# Сохранение профилей VK и синхронизация имён лидов
+async def upsert_vk_profiles(db: AsyncSession, profiles: List[dict]) -> None:
+    if not profiles:
+        return
+
+    statement = insert(VkProfile).values(profiles)
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[VkProfile.vk_id],
+            set_={
+                "full_name": statement.excluded.full_name,
+                "photo_url": statement.excluded.photo_url,
+                "fetched_at": statement.excluded.fetched_at,
+            }
+        )
+    )
+    await db.execute(
+        update(Lead)
+        .where(
+            Lead.vk_id == VkProfile.vk_id,
+            VkProfile.vk_id.in_([profile["vk_id"] for profile in profiles]),
+            Lead.full_name.is_distinct_from(VkProfile.full_name)
+        )
+        .values(full_name=VkProfile.full_name)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+# Отметка попытки загрузки профилей, которых нет в VK
+async def mark_vk_profiles_missing(db: AsyncSession, vk_ids: List[str], fetched_at: datetime) -> None:
+    """
+    Записать время попытки для профилей, которые VK не вернул.
+
+    Строка без имени и фото (или уже сохранённый профиль) получает новое
+    fetched_at, поэтому такой vk_id снова запрашивается только через max_age,
+    а не на каждом проходе VkProfileRefresher.
+    """
+    if not vk_ids:
+        return
+
+    statement = insert(VkProfile).values([{"vk_id": vk_id, "fetched_at": fetched_at} for vk_id in vk_ids])
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[VkProfile.vk_id],
+            set_={"fetched_at": statement.excluded.fetched_at}
+        )
+    )
+    await db.commit()
+
+
+# Имя пользователя VK из сохранённых данных, без обращения к VK
+async def get_known_full_name(db: AsyncSession, vk_id: str) -> Optional[str]:
+    """
+    Имя из vk_profiles, а если профиля нет - имя лида с этим vk_id.
+
+    :return: Имя или None, если пользователь неизвестен.
+    """
+    return await db.scalar(
+        select(func.coalesce(
+            select(VkProfile.full_name).where(VkProfile.vk_id == vk_id).scalar_subquery(),
+            select(Lead.full_name).where(Lead.vk_id == vk_id).scalar_subquery()
+        ))
+    )
+
+
+# Загрузка профилей из VK пачкой и сохранение в vk_profiles
+async def refresh_vk_profiles(db: AsyncSession, vk_ids: List[str]) -> int:
+    """
+    Обновить профили VK для указанных пользователей.
+
+    Пользователи, которых VK не вернул, отмечаются в vk_profiles временем
+    попытки. Временные ошибки VK не отмечаются: такие профили будут
+    запрошены на следующем проходе.
+
+    :param db: Асинхронная сессия базы данных.
+    :param vk_ids: Список VK ID.
+    :return: Количество успешно обновлённых профилей.
+    """
+    vk_ids = list(dict.fromkeys(vk_ids))
+    user_infos = await asyncio.gather(
+        *(get_user_info(vk_id, background=True) for vk_id in vk_ids),
+        return_exceptions=True
+    )
+    fetched_at = datetime.utcnow()
+    profiles = [
+        {
+            "vk_id": vk_id,
+            "full_name": user_info["full_name"],
+            "photo_url": user_info.get("photo_200"),
+            "fetched_at": fetched_at,
+        }
+        for vk_id, user_info in zip(vk_ids, user_infos)
+        if not isinstance(user_info, Exception)
+    ]
+    await upsert_vk_profiles(db, profiles)
+    await mark_vk_profiles_missing(
+        db,
+        [vk_id for vk_id, user_info in zip(vk_ids, user_infos) if isinstance(user_info, VKUserNotFound)],
+        fetched_at
+    )
+    return len(profiles)
+
+
+# Поиск профилей, которые нужно загрузить или обновить
+async def get_stale_vk_ids(db: AsyncSession, max_age: timedelta, limit: int) -> List[str]:
+    """
+    Получить VK ID лидов без профиля и профилей старше max_age.
+
+    :param db: Асинхронная сессия базы данных.
+    :param max_age: Максимальный возраст профиля.
+    :param limit: Максимальное количество VK ID.
+    :return: Список VK ID, начиная с лидов без профиля.
+    """
+    missing = await db.scalars(
+        select(Lead.vk_id)
+        .outerjoin(VkProfile, VkProfile.vk_id == Lead.vk_id)
+        .where(Lead.vk_id.is_not(None), VkProfile.vk_id.is_(None))
+        .distinct()
+        .limit(limit)
+    )
+    vk_ids = list(missing)
+    if len(vk_ids) >= limit:
+        return vk_ids
+
+    stale = await db.scalars(
+        select(VkProfile.vk_id)
+        .where(VkProfile.fetched_at < datetime.utcnow() - max_age)
+        .order_by(VkProfile.fetched_at)
+        .limit(limit - len(vk_ids))
+    )
+    return vk_ids + list(stale)
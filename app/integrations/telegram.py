@@ -1,24 +1,40 @@
 import httpx
-from typing import List
+from typing import Optional
 from app.core.config import settings
+from app.core.http import get_http_client
 
 TELEGRAM_BOT_TOKEN = settings.telegram_bot_token
 TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+TELEGRAM_API_TIMEOUT = httpx.Timeout(settings.telegram_api_timeout)
 
-async def send_telegram_message(message: str, chat_ids: List[int]) -> None:
+
+class TelegramRetryAfter(Exception):
+    """
+    Telegram ответил 429 и попросил повторить отправку через retry_after секунд.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Too Many Requests: retry after {retry_after}")
+        self.retry_after = retry_after
+
+
+async def deliver_telegram_message(chat_id: str, message: str, client: Optional[httpx.AsyncClient] = None) -> None:
     """
-    Отправить сообщение через Telegram бот.
+    Отправить сообщение в один чат.
 
+    :param chat_id: ID аккаунта, куда отправить сообщение.
     :param message: Текст сообщения.
-    :param chat_ids: Список ID аккаунтов, куда отправить сообщение.
+    :param client: HTTP-клиент, по умолчанию общий клиент приложения.
+    :raises TelegramRetryAfter: Если Telegram ограничил частоту отправки.
+    :raises httpx.HTTPError: При остальных ошибках отправки.
     """
-    async with httpx.AsyncClient() as client:
-        for chat_id in chat_ids:
-            try:
-                response = await client.post(
-                    TELEGRAM_API_URL,
-                    json={"chat_id": chat_id, "text": message, "parse_mode": "Markdown"}
-                )
-                response.raise_for_status()  # Проверяем, нет ли ошибок
-            except httpx.HTTPError as exc:
-                print(f"Ошибка при отправке сообщения пользователю {chat_id}: {exc}")
+    client = client or get_http_client()
+    response = await client.post(
+        TELEGRAM_API_URL,
+        json={"chat_id": chat_id, "text": message, "parse_mode": "Markdown"},
+        timeout=TELEGRAM_API_TIMEOUT
+    )
+    if response.status_code == 429:
+        retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+        raise TelegramRetryAfter(retry_after)
+    response.raise_for_status()  # Проверяем, нет ли ошибок
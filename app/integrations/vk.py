@@ -0,0 +1,215 @@
+import asyncio
+import itertools
+import logging
+import random
+from time import monotonic
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.http import get_http_client
+
+logger = logging.getLogger(__name__)
+
+VK_API_URL = "https://api.vk.com/method/"
+VK_API_VERSION = "5.131"
+VK_API_TIMEOUT = httpx.Timeout(settings.vk_api_timeout)
+
+# Код ошибки VK "Too many requests per second"
+VK_TOO_MANY_REQUESTS = 6
+
+# Приоритеты запросов: меньшее значение обслуживается раньше
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class VKAPIError(RuntimeError):
+    """
+    Ошибка, которую вернул метод VK API.
+    """
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"API Error: {message}")
+        self.code = code
+        self.message = message
+
+
+class _VKRequest:
+    __slots__ = ("method", "params", "client", "future", "attempt")
+
+    def __init__(self, method: str, params: dict, client: Optional[httpx.AsyncClient], future: asyncio.Future):
+        self.method = method
+        self.params = params
+        self.client = client
+        self.future = future
+        self.attempt = 0
+
+
+class VKRequestScheduler:
+    """
+    Планировщик исходящих вызовов VK API с ограничением частоты.
+
+    Запросы не отбрасываются, а ждут в очереди с приоритетами, пока
+    token bucket не выдаст разрешение. Интерактивные запросы обслуживаются
+    раньше фоновых. Ошибка VK с кодом 6 повторяется с экспоненциальной
+    задержкой и случайным разбросом.
+
+    :param rate: Допустимое число запросов в секунду.
+    :param burst: Ёмкость token bucket.
+    :param max_retries: Сколько раз повторять запрос при ошибке 6.
+    :param backoff_base: Базовая задержка перед повтором в секундах.
+    :param backoff_max: Максимальная задержка перед повтором в секундах.
+    """
+
+    def __init__(self, rate: float, burst: int, max_retries: int, backoff_base: float, backoff_max: float):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._in_flight: Dict[asyncio.Task, _VKRequest] = {}
+        self._retries: Dict[_VKRequest, asyncio.TimerHandle] = {}
+        self._sequence = itertools.count()
+        self._tokens = float(burst)
+        self._updated_at = monotonic()
+
+    async def call(
+        self,
+        method: str,
+        params: dict,
+        priority: int = PRIORITY_INTERACTIVE,
+        client: Optional[httpx.AsyncClient] = None
+    ) -> Any:
+        """
+        Вызвать метод VK API.
+
+        :param method: Название метода, например "users.get".
+        :param params: Параметры метода без access_token и v.
+        :param priority: Приоритет запроса.
+        :param client: HTTP-клиент, по умолчанию общий клиент приложения.
+        :return: Содержимое поля response ответа VK.
+        :raises VKAPIError: Если VK вернул ошибку.
+        """
+        self._ensure_started()
+        request = _VKRequest(method, params, client, self._loop.create_future())
+        self._enqueue(priority, request)
+        return await request.future
+
+    async def stop(self) -> None:
+        """
+        Остановить планировщик. Все незавершённые вызовы, в том числе
+        ожидающие повтора, завершаются ошибкой RuntimeError.
+        """
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+
+        pending = list(self._in_flight.values())
+        tasks = list(self._in_flight)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for request, handle in self._retries.items():
+            handle.cancel()
+            pending.append(request)
+        self._retries.clear()
+        while self._queue is not None and not self._queue.empty():
+            _, _, request = self._queue.get_nowait()
+            pending.append(request)
+
+        for request in pending:
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("VK request scheduler stopped"))
+        self._loop = self._queue = self._dispatcher = None
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.PriorityQueue()
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    def _enqueue(self, priority: int, request: _VKRequest) -> None:
+        self._queue.put_nowait((priority, next(self._sequence), request))
+
+    def _retry(self, priority: int, request: _VKRequest) -> None:
+        del self._retries[request]
+        self._enqueue(priority, request)
+
+    async def _acquire(self) -> None:
+        while True:
+            now = monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def _dispatch(self) -> None:
+        while True:
+            item = await self._queue.get()
+            await self._acquire()
+            # Пока ждали токен, мог прийти запрос с более высоким приоритетом
+            self._queue.put_nowait(item)
+            priority, _, request = self._queue.get_nowait()
+            if request.future.done():
+                continue
+
+            task = asyncio.create_task(self._execute(priority, request))
+            self._in_flight[task] = request
+            task.add_done_callback(lambda done: self._in_flight.pop(done, None))
+
+    async def _execute(self, priority: int, request: _VKRequest) -> None:
+        client = request.client or get_http_client()
+        try:
+            response = await client.post(
+                VK_API_URL + request.method,
+                data={
+                    **request.params,
+                    "access_token": settings.application_secret_key,
+                    "v": VK_API_VERSION
+                },
+                timeout=VK_API_TIMEOUT
+            )
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            if not request.future.done():
+                request.future.set_exception(e)
+            return
+
+        if "response" in data:
+            if not request.future.done():
+                request.future.set_result(data["response"])
+            return
+
+        error = data.get("error", {})
+        code = error.get("error_code")
+        if code == VK_TOO_MANY_REQUESTS and request.attempt < self.max_retries:
+            delay = min(self.backoff_max, self.backoff_base * 2 ** request.attempt)
+            delay *= random.uniform(0.5, 1.5)
+            request.attempt += 1
+            logger.warning("VK rate limit hit on %s, retry %d in %.2fs", request.method, request.attempt, delay)
+            self._retries[request] = self._loop.call_later(delay, self._retry, priority, request)
+            return
+
+        if not request.future.done():
+            request.future.set_exception(VKAPIError(code, error.get("error_msg", "Unknown error")))
+
+
+vk_scheduler = VKRequestScheduler(
+    rate=settings.vk_api_rate_limit,
+    burst=settings.vk_api_burst,
+    max_retries=settings.vk_api_max_retries,
+    backoff_base=settings.vk_api_backoff_base,
+    backoff_max=settings.vk_api_backoff_max
+)
@@ -3,14 +3,27 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
+from app.core.config import settings
 from app.core.database import engine, Base
-from app.models import combined, group, group_notification_status, lead, collector, notification
+from app.core.http import start_http_client, close_http_client
+from app.core.migrations import run_migrations
+from app.core.responses import FastJSONResponse
+from app.integrations.vk import vk_scheduler
+from app.models import combined, group, group_notification_status, lead, collector, notification, vk_profile, telegram_outbox, counter_shard, idempotency_key, collector_stats
 from app.routers.api.group import router as group_router
 from app.routers.api.auth import router as auth_router
+from app.routers.api.analytics import router as analytics_router
 from app.routers.api.collector import router as collector_router
 from app.routers.api.notification import router as notification_router
 from app.routers.api.lead import router as lead_router
 from app.routers.api.other import router as other_router
+from app.routers.api.metrics import router as metrics_router
+from app.workers.lead_enrichment import lead_enrichment
+from app.workers.vk_profile_refresher import vk_profile_refresher
+from app.workers.telegram_outbox import telegram_outbox as telegram_outbox_worker
+from app.workers.visit_buffer import visit_buffer
+from app.workers.counters import counter_compactor
+from app.workers.idempotency_cleaner import idempotency_key_cleaner
 
 
 @asynccontextmanager
@@ -18,7 +31,28 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         # await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
+    await start_http_client()
+    if settings.background_workers_enabled:
+        lead_enrichment.start()
+        vk_profile_refresher.start()
+        telegram_outbox_worker.start()
+        counter_compactor.start()
+        if settings.idempotency_db_enabled:
+            idempotency_key_cleaner.start()
+    if settings.lead_ingest_mode == "buffered":
+        visit_buffer.start()
     yield
+    # Буфер дописывает переходы до остановки воркера обогащения,
+    # чтобы новые лиды успели попасть в его очередь
+    await visit_buffer.stop()
+    await idempotency_key_cleaner.stop()
+    await counter_compactor.stop()
+    await telegram_outbox_worker.stop()
+    await vk_profile_refresher.stop()
+    await lead_enrichment.stop()
+    await vk_scheduler.stop()
+    await close_http_client()
     await engine.dispose()
 
 
@@ -31,7 +65,11 @@ async def lifespan(app: FastAPI):
 # async def shutdown():
 #     await engine.dispose()
 
-app = FastAPI(lifespan=lifespan, swagger_ui_parameters={"syntaxHighlight.theme": "obsidian"})
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+    swagger_ui_parameters={"syntaxHighlight.theme": "obsidian"}
+)
 
 origins = [
     "https://*.vercel.app",
@@ -46,7 +84,7 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "HEAD", "PATCH"],
-    allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
+    allow_headers=["Content-Type", "Authorization", "X-Requested-With", "Idempotency-Key"],
 )
 
 @app.get("/docs", include_in_schema=False)
@@ -59,7 +97,10 @@ async def custom_swagger_ui_html():
 
 app.include_router(group_router, prefix="/api")
 app.include_router(auth_router, prefix="/api")
+# До collector_router: его маршрут /{collector_id} перехватил бы /analytics
+app.include_router(analytics_router, prefix="/api")
 app.include_router(collector_router, prefix="/api")
 app.include_router(notification_router, prefix="/api")
 app.include_router(lead_router, prefix="/api")
-app.include_router(other_router, prefix="/api")
\ No newline at end of file
+app.include_router(other_router, prefix="/api")
+app.include_router(metrics_router, prefix="/api")
\ No newline at end of file
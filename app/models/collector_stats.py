@@ -0,0 +1,11 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, SmallInteger
+from app.core.database import Base
+
+class CollectorStatsHourly(Base):
+    __tablename__ = "collector_stats_hourly"
+
+    collector_id = Column(Integer, ForeignKey("collectors.id", ondelete="CASCADE"), primary_key=True)
+    hour = Column(DateTime, primary_key=True)  # начало часа по UTC
+    shard = Column(SmallInteger, primary_key=True, default=0, server_default="0")  # корзина часа делится на шарды, как counter_shards
+    visits = Column(Integer, nullable=False, default=0)
+    submissions = Column(Integer, nullable=False, default=0)
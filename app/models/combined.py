@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Boolean, DateTime, String
+from sqlalchemy import Column, Integer, ForeignKey, Boolean, DateTime, String, Index, text
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -10,7 +10,19 @@ class CollectorLead(Base):
     checked_form = Column(Boolean, default=False)
     request_form = Column(Boolean, default=False)
     datetime_request = Column(DateTime, nullable=True)
+    datetime_visit = Column(DateTime, nullable=True)  # время первого перехода, UTC
     # Дополнительные поля могут быть добавлены здесь
 
     collector = relationship("Collector", back_populates="collector_leads", lazy="selectin")
-    lead = relationship("Lead", back_populates="collector_leads")
\ No newline at end of file
+    lead = relationship("Lead", back_populates="collector_leads")
+
+    __table_args__ = (
+        # Постраничный список заявок коллектора (см. get_leads_by_collector)
+        Index(
+            "ix_collector_lead_requests",
+            "collector_id",
+            text("datetime_request DESC NULLS LAST"),
+            text("lead_id DESC"),
+            postgresql_where=text("request_form")
+        ),
+    )
\ No newline at end of file
@@ -0,0 +1,10 @@
+from sqlalchemy import BigInteger, Column, Integer, SmallInteger, String
+from app.core.database import Base
+
+class CounterShard(Base):
+    __tablename__ = "counter_shards"
+
+    kind = Column(String, primary_key=True)  # "collector_leads" или "group_collectors"
+    owner_id = Column(Integer, primary_key=True)  # ID коллектора или группы
+    shard = Column(SmallInteger, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,12 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+from app.core.database import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)  # "<метод> <путь> <Idempotency-Key>"
+    request_hash = Column(String, nullable=False)  # SHA-256 строки запроса и тела
+    status_code = Column(Integer, nullable=True)  # NULL, пока запрос выполняется
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
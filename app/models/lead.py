@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String, Boolean, ForeignKey, Enum, Text
+from sqlalchemy import Column, Computed, DateTime, Integer, String, Boolean, ForeignKey, Enum, Text
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -7,7 +7,10 @@ class Lead(Base):
 
     id = Column(Integer, primary_key=True)
     phone = Column(String, nullable=True)
-    vk_id = Column(String, nullable=True)
+    vk_id = Column(String, unique=True, nullable=True)
     full_name = Column(String, nullable=False)
+    # Только цифры телефона для поиска. Триграммные индексы по full_name
+    # и phone_normalized создаются миграцией 0003, так как требуют pg_trgm
+    phone_normalized = Column(String, Computed(r"regexp_replace(coalesce(phone, ''), '\D', '', 'g')", persisted=True))
 
     collector_leads = relationship("CollectorLead", back_populates="lead")
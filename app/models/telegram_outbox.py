@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, text
+from app.core.database import Base
+
+class TelegramOutbox(Base):
+    __tablename__ = "telegram_outbox"
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(String, nullable=False)
+    message = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # "pending", "sent" или "failed"
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_telegram_outbox_due", "next_attempt_at", postgresql_where=text("status = 'pending'")),
+    )
@@ -0,0 +1,11 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, String
+from app.core.database import Base
+
+class VkProfile(Base):
+    __tablename__ = "vk_profiles"
+
+    vk_id = Column(String, primary_key=True)
+    full_name = Column(String, nullable=True)
+    photo_url = Column(String, nullable=True)
+    fetched_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
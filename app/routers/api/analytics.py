@@ -0,0 +1,62 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.utils.analytics_cache import get_cached_group_analytics
+from app.routers.dependencies.auth import get_group_depend
+from app.schemas.analytics import CollectorAnalytics
+from app.schemas.group import GroupRead
+
+router = APIRouter()
+
+
+# Аналитика всех сборщиков группы для экрана аналитики
+@router.get(
+    "/analytics",
+    response_model=list[CollectorAnalytics],
+    tags=["analytics"],
+    summary="Получить аналитику по всем сборщикам",
+    description="Возвращает количество лидов, посетителей и CR для каждого сборщика текущей группы "
+                "за всё время или за период: day, week или month.",
+    responses={
+        200: {
+            "description": "Аналитика сборщиков группы",
+            "content": {
+                "application/json": {
+                    "example": [CollectorAnalytics.example()]
+                }
+            }
+        },
+        400: {
+            "description": "Неизвестный период",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Invalid period. Choose 'day', 'week', or 'month'."}
+                }
+            }
+        },
+        401: {
+            "description": "Неавторизованная попытка получения аналитики",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Unauthorized"}
+                }
+            }
+        }
+    }
+)
+async def get_group_analytics_endpoint(
+    period: Optional[str] = None,
+    group: GroupRead = Depends(get_group_depend)
+):
+    """
+    Возвращает аналитику всех сборщиков текущей группы одним запросом.
+
+    - **period**: "day", "week" или "month". Без периода - за всё время.
+    """
+    if not group:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+
+    try:
+        analytics = await get_cached_group_analytics(group.id, period)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid period. Choose 'day', 'week', or 'month'.")
+    return analytics
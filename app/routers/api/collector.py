@@ -1,19 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.core.database import get_db
 from app.crud.collector import (
     create_collector,
     get_collectors_by_group,
     update_collector,
     delete_collector,
-    get_collector_by_id
+    get_collector_by_id,
+    get_collector_snapshot,
+    collector_belongs_to_group
 )
 from app.models.group import Group
-from app.schemas.collector import CollectorCreate, CollectorRead, CollectorReadWithVkId
+from app.schemas.collector import CollectorCreate, CollectorRead, CollectorReadWithVkId, CollectorPublic
 from app.routers.dependencies.auth import get_group_depend
 from app.schemas.group import GroupRead
-from app.schemas.analytics import CollectorAnalytics
-from app.crud.collector import get_collector_analytics
+from app.schemas.analytics import CollectorAnalytics, CollectorAnalyticsSeries
+from app.crud.analytics import get_collector_series
+from app.utils.analytics_cache import get_cached_collector_analytics
 
 router = APIRouter()
 
@@ -223,13 +228,78 @@ async def get_collector(collector_id: int, session: AsyncSession = Depends(get_d
     return collector
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match сравнивается слабо: W/"x" совпадает с "x"
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@router.get(
+    "/collectors/{collector_id}/public",
+    response_model=CollectorPublic,
+    tags=["collector"],
+    summary="Публичная карточка сборщика",
+    description="Возвращает данные сборщика для страницы посетителя без авторизации. "
+                "Ответ кэшируется: поддерживаются ETag и If-None-Match.",
+    responses={
+        200: {
+            "description": "Карточка сборщика",
+            "content": {
+                "application/json": {
+                    "example": CollectorPublic.example()
+                }
+            }
+        },
+        304: {
+            "description": "Карточка не изменилась с версии из If-None-Match"
+        },
+        404: {
+            "description": "Сборщик не найден",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Collector not found"}
+                }
+            }
+        }
+    }
+)
+async def get_collector_public_endpoint(
+    collector_id: int,
+    db: AsyncSession = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Эндпоинт для страницы посетителя. Карточка берётся из кэша процесса,
+    повторные загрузки поглощают nginx и браузер по заголовкам кэширования.
+
+    - **collector_id**: ID сборщика.
+    """
+    snapshot = await get_collector_snapshot(db, collector_id)
+    if snapshot is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Collector not found")
+
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": f"public, max-age={settings.collector_snapshot_max_age}"
+    }
+    if _etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
 # Эндпоинт для получения аналитики по коллектору
 @router.get(
     "/collectors/{collector_id}/analytics",
     response_model=CollectorAnalytics,
     tags=["collector"],
     summary="Получить аналитику по сборщику",
-    description="Возвращает количество лидов, посетителей и CR для указанного сборщика.",
+    description="Возвращает количество лидов, посетителей и CR для указанного сборщика "
+                "за всё время или за период: day, week или month.",
     responses={
         200: {
             "description": "Аналитика успешно получена",
@@ -239,6 +309,14 @@ async def get_collector(collector_id: int, session: AsyncSession = Depends(get_d
                 }
             }
         },
+        400: {
+            "description": "Неизвестный период",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Invalid period. Choose 'day', 'week', or 'month'."}
+                }
+            }
+        },
         401: {
             "description": "Неавторизованная попытка получения аналитики",
             "content": {
@@ -259,18 +337,78 @@ async def get_collector(collector_id: int, session: AsyncSession = Depends(get_d
 )
 async def get_collector_analytics_endpoint(
     collector_id: int,
-    db: AsyncSession = Depends(get_db),
+    period: Optional[str] = None,
     group: GroupRead = Depends(get_group_depend)
 ):
     """
     Эндпоинт для получения аналитики по коллектору.
     
     - **collector_id**: ID коллектора, по которому требуется аналитика.
+    - **period**: "day", "week" или "month". Без периода - за всё время.
     """
     if not group:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     
-    analytics = await get_collector_analytics(db, collector_id, group)
+    try:
+        analytics = await get_cached_collector_analytics(collector_id, group.id, period)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid period. Choose 'day', 'week', or 'month'.")
     if analytics is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Collector not found")
     return analytics
+
+
+# Ряд аналитики по коллектору для графиков
+@router.get(
+    "/collectors/{collector_id}/analytics/series",
+    response_model=CollectorAnalyticsSeries,
+    tags=["collector"],
+    summary="Получить ряд аналитики по сборщику",
+    description="Возвращает количество посетителей и заявок сборщика по часам или дням "
+                "за последние days дней. Пустые интервалы заполнены нулями, ряд отдаётся массивами.",
+    responses={
+        200: {
+            "description": "Ряд аналитики успешно получен",
+            "content": {
+                "application/json": {
+                    "example": CollectorAnalyticsSeries.example()
+                }
+            }
+        },
+        401: {
+            "description": "Неавторизованная попытка получения аналитики",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Unauthorized"}
+                }
+            }
+        },
+        404: {
+            "description": "Сборщик не найден",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Collector not found"}
+                }
+            }
+        }
+    }
+)
+async def get_collector_series_endpoint(
+    collector_id: int,
+    granularity: Literal["hour", "day"] = "day",
+    days: int = Query(30, ge=1, le=settings.analytics_series_max_days),
+    db: AsyncSession = Depends(get_db),
+    group: GroupRead = Depends(get_group_depend)
+):
+    """
+    Эндпоинт для графиков посетителей, заявок и CR по коллектору.
+
+    - **collector_id**: ID коллектора.
+    - **granularity**: Интервал ряда: "hour" или "day" (по UTC).
+    - **days**: Глубина ряда в днях.
+    """
+    if not group:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if not await collector_belongs_to_group(db, collector_id, group.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Collector not found")
+    return await get_collector_series(db, collector_id, granularity, days)
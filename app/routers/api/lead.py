@@ -1,43 +1,94 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, SessionLocal
 from app.crud.lead import (
     create_lead_visit,
     delete_lead,
     get_leads_by_collector,
     submit_lead_request,
-    get_collector_analytics,
-    update_lead
+    import_leads,
+    iter_lead_export
 )
+from app.crud.collector import collector_belongs_to_group
 from app.routers.dependencies.auth import get_group_depend
-from app.schemas.analytics import CollectorAnalytics
+from app.routers.dependencies.idempotency import get_idempotency_key
 from app.schemas.combined import CollectorLeadRead
-from app.schemas.lead import LeadCreate, LeadRead
+from app.schemas.lead import LeadCreate, LeadRead, LeadImportResult, LeadPage
 from app.models.combined import CollectorLead
 from app.models.lead import Lead
-from typing import Optional, List
+from app.utils.idempotency import IdempotentRequest, idempotency_store
+from app.utils.lead_io import (
+    CSV_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPES,
+    LeadImportError,
+    csv_header,
+    encode_csv,
+    encode_ndjson,
+    parse_csv,
+    parse_ndjson
+)
+from app.workers.visit_buffer import visit_buffer
+from app.workers.vk_profile_refresher import vk_profile_refresher
+from typing import Optional, List, Literal
 
 from app.schemas.group import GroupRead
 
 router = APIRouter()
 
 # Эндпоинт для создания записи о переходе лида с использованием vk_id
-@router.post("/collectors/{collector_id}/leads", response_model=LeadRead, status_code=status.HTTP_201_CREATED, tags=["leads"])
+@router.post(
+    "/collectors/{collector_id}/leads",
+    response_model=LeadRead,
+    status_code=status.HTTP_201_CREATED,
+    tags=["leads"],
+    responses={
+        status.HTTP_202_ACCEPTED: {"description": "Переход принят в буфер (lead_ingest_mode=buffered)."},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Буфер переходов переполнен, повторите позже."}
+    }
+)
 async def create_lead(
     collector_id: int,
     lead_data: LeadCreate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[IdempotentRequest] = Depends(get_idempotency_key)
 ):
     """
     Создает новую запись о переходе лида с использованием vk_id для указанного collector_id, если такой записи еще нет.
     Устанавливает флаг `checked_form=True` для нового лида.
+
+    В режиме `lead_ingest_mode=buffered` переход записывается в базу пачкой
+    в фоне, а эндпоинт сразу отвечает 202 без тела.
+
+    Повтор запроса с тем же заголовком `Idempotency-Key` возвращает
+    сохранённый ответ без обращения к базе лидов. Повтор с другим телом
+    получает 422, повтор во время выполнения исходного запроса - 409.
     """
-    lead = await create_lead_visit(db, lead_data.vk_id, collector_id)
-    if not lead:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Lead visit already recorded for this collector.")
-    return LeadRead.model_validate(lead)
+    async with idempotency_store.reserve(db, idempotency_key) as replay:
+        if replay is not None:
+            return replay
+
+        if settings.lead_ingest_mode == "buffered":
+            if not visit_buffer.add(lead_data.vk_id, collector_id):
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Lead visit buffer is full, retry later.",
+                    headers={"Retry-After": "1"}
+                )
+            if idempotency_key is not None:
+                return await idempotency_store.respond(db, idempotency_key, status.HTTP_202_ACCEPTED)
+            return Response(status_code=status.HTTP_202_ACCEPTED)
+
+        lead = await create_lead_visit(db, lead_data.vk_id, collector_id)
+        if not lead:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Lead visit already recorded for this collector.")
+        if idempotency_key is not None:
+            return await idempotency_store.respond(
+                db, idempotency_key, status.HTTP_201_CREATED, LeadRead.model_validate(lead)
+            )
+        return lead
 
 
 # Эндпоинт для обновления информации о лидах при отправке заявки
@@ -46,58 +97,153 @@ async def update_lead_request(
     collector_id: int,
     vk_id: str,
     phone_number: str = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[IdempotentRequest] = Depends(get_idempotency_key)
 ):
-    lead = await submit_lead_request(db, vk_id, collector_id)
-    await update_lead(db, phone_number, vk_id)
+    """
+    Отмечает отправку заявки лидом и сохраняет его телефон.
 
-    if not lead:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lead not found or request already submitted.")
+    Повтор запроса с тем же заголовком `Idempotency-Key` возвращает
+    сохранённый ответ, а не 404 для уже отправленной заявки. Повтор
+    с другим телефоном получает 422, повтор во время выполнения исходного запроса - 409.
+    """
+    async with idempotency_store.reserve(db, idempotency_key) as replay:
+        if replay is not None:
+            return replay
 
-    # Обновляем объект и возвращаем его
-    await db.refresh(lead)
-    return CollectorLeadRead.model_validate(lead)
+        lead = await submit_lead_request(db, vk_id, collector_id, phone_number)
+        if not lead:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lead not found or request already submitted.")
+        if idempotency_key is not None:
+            return await idempotency_store.respond(
+                db, idempotency_key, status.HTTP_200_OK, CollectorLeadRead.model_validate(lead)
+            )
+        return lead
 
 
-@router.get(
-    "/collectors/{collector_id}/analytics", 
-    response_model=CollectorAnalytics, 
-    tags=["collector"], 
-    operation_id="get_collector_analytics_by_period"
+@router.post(
+    "/collectors/{collector_id}/leads/import",
+    response_model=LeadImportResult,
+    tags=["leads"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                CSV_MEDIA_TYPE: {"schema": {"type": "string"}},
+                NDJSON_MEDIA_TYPES[0]: {"schema": {"type": "string"}}
+            }
+        }
+    }
 )
-async def get_collector_analytics_endpoint(
+async def import_leads_endpoint(
     collector_id: int,
-    period: str,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    user: GroupRead = Depends(get_group_depend)
+    group: GroupRead = Depends(get_group_depend)
 ):
     """
-    Получает аналитику для указанного collector_id за период.
-    Период может быть "day", "week" или "month".
+    Импортирует лидов в коллектор из файла CSV (`text/csv`, первая строка -
+    заголовок) или NDJSON (`application/x-ndjson`, объект на строку).
+
+    Колонки: `vk_id` (обязательно), `phone`, `full_name`, `request_form`,
+    `datetime_request` (ISO 8601). Файл читается потоком и не хранится в памяти
+    целиком. При ошибке в любой строке ничего не импортируется.
     """
-    
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type == CSV_MEDIA_TYPE:
+        records = parse_csv(request.stream())
+    elif media_type in NDJSON_MEDIA_TYPES:
+        records = parse_ndjson(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Use text/csv or application/x-ndjson."
+        )
+
+    if not group:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if not await collector_belongs_to_group(db, collector_id, group.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Collector not found")
+
     try:
-        analytics = await get_collector_analytics(db, collector_id, period)
-    except ValueError:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid period. Choose 'day', 'week', or 'month'.")
-    return analytics
+        result = await import_leads(db, collector_id, records)
+    except LeadImportError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Профили новых лидов загружаются в фоне, не дожидаясь очередного прохода
+    vk_profile_refresher.wake()
+    return result
+
+
+@router.get(
+    "/collectors/{collector_id}/leads/export",
+    tags=["leads"],
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {CSV_MEDIA_TYPE: {}, NDJSON_MEDIA_TYPES[0]: {}}, "description": "Файл с лидами"},
+        404: {"description": "Коллектор не найден"}
+    }
+)
+async def export_leads_endpoint(
+    collector_id: int,
+    format: Literal["csv", "ndjson"] = Query("csv", description="Формат файла"),
+    requests_only: bool = Query(True, description="Только лиды, отправившие заявку"),
+    db: AsyncSession = Depends(get_db),
+    group: GroupRead = Depends(get_group_depend)
+):
+    """
+    Выгружает лидов коллектора в CSV или NDJSON.
+
+    Строки читаются из базы серверным курсором и отдаются клиенту по мере
+    чтения, поэтому выгрузка начинается сразу и не держит всех лидов в памяти.
+    """
+    if not group:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if not await collector_belongs_to_group(db, collector_id, group.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Collector not found")
+
+    encode = encode_csv if format == "csv" else encode_ndjson
 
+    async def body():
+        if format == "csv":
+            yield csv_header()
+        # Сессия зависимости закрывается до отправки тела, поэтому у потока своя
+        async with SessionLocal() as session:
+            async for rows in iter_lead_export(session, collector_id, requests_only):
+                yield encode(rows)
 
-@router.get("/collectors/{collector_id}/leads", response_model=List[LeadRead], tags=["leads"])
+    return StreamingResponse(
+        body(),
+        media_type=CSV_MEDIA_TYPE if format == "csv" else NDJSON_MEDIA_TYPES[0],
+        headers={"Content-Disposition": f'attachment; filename="collector-{collector_id}-leads.{format}"'}
+    )
+
+
+@router.get("/collectors/{collector_id}/leads", response_model=LeadPage, tags=["leads"])
 async def get_leads_endpoint(
     collector_id: int,
-    search: Optional[str] = Query(None, description="Поиск по имени лидов"),
+    search: Optional[str] = Query(None, description="Поиск по имени или телефону лидов"),
+    rank: bool = Query(False, description="Сортировать результаты поиска по похожести имени"),
+    limit: int = Query(settings.leads_page_size, ge=1, le=settings.leads_page_size_max, description="Размер страницы"),
+    cursor: Optional[str] = Query(None, description="Курсор next_cursor из предыдущей страницы"),
     db: AsyncSession = Depends(get_db),
 ):
     """
-    Получить список лидов для указанного коллектора. 
-    Можно использовать поисковый параметр `search` для фильтрации по имени.
+    Получить страницу лидов для указанного коллектора, от новых заявок к старым.
+    Можно использовать поисковый параметр `search` для фильтрации по имени или телефону.
     
     - **collector_id**: ID коллектора.
-    - **search**: Поисковый параметр для фильтрации по имени.
+    - **search**: Поисковый параметр для фильтрации по подстроке имени или цифрам телефона.
+    - **rank**: Сортировать результаты поиска по похожести имени, страницы по тому же курсору.
+    - **limit**: Количество лидов на странице.
+    - **cursor**: Курсор следующей страницы (`next_cursor` предыдущего ответа).
     """
-    leads = await get_leads_by_collector(db, collector_id, search)
-    if not leads:
+    try:
+        leads = await get_leads_by_collector(db, collector_id, search, limit, cursor, rank)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+    if not leads.items and cursor is None:
         raise HTTPException(status_code=404, detail="No leads found for this collector.")
     return leads
 
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+from app.core.http import get_http_pool_stats
+from app.routers.dependencies.auth import verify_metrics_token
+from app.utils.analytics_cache import analytics_cache
+
+# Служебные метрики доступны только по токену settings.metrics_token,
+# а снаружи nginx их не проксирует
+router = APIRouter(dependencies=[Depends(verify_metrics_token)])
+
+@router.get("/metrics/http-pool", tags=["metrics"], include_in_schema=False)
+async def get_http_pool_metrics():
+    """
+    Статистика пула соединений общего HTTP-клиента (занятые и простаивающие соединения).
+    """
+    return get_http_pool_stats()
+
+
+@router.get("/metrics/analytics-cache", tags=["metrics"], include_in_schema=False)
+async def get_analytics_cache_metrics():
+    """
+    Попадания и промахи кэша аналитики. coalesced - запросы, дождавшиеся
+    уже идущего вычисления вместо своего.
+    """
+    return analytics_cache.stats()
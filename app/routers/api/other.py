@@ -1,7 +1,8 @@
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
 import pytz
-from app.integrations.telegram import send_telegram_message
+from app.crud.telegram_outbox import enqueue_telegram_messages
+from app.workers.telegram_outbox import telegram_outbox
 from app.crud.collector import get_collector_by_id
 from app.crud.group import get_group_by_id
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,8 +11,7 @@ from app.routers.dependencies.auth import get_group_depend
 from app.schemas.group import GroupRead
 from app.core.config import settings
 from typing import List
-
-from app.utils.get_user_vk import get_user_info
+from app.crud.vk_profile import get_known_full_name
 
 router = APIRouter()
 
@@ -24,13 +24,15 @@ async def file_complaint(
 ):
     """
     Подать жалобу на сборщик. Жалоба отправляется админам в Telegram.
+    Жалоба сохраняется в очередь и доставляется в фоне, ответ не ждёт Telegram.
+    Имя пользователя берётся из сохранённых профилей, без обращения к VK.
     """
     # Получаем информацию о сборщике
     collector = await get_collector_by_id(db, collector_id)
     if not collector:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Collector not found")
     
-    user_info = await get_user_info(vk_user_id)
+    full_name = await get_known_full_name(db, vk_user_id)
     
     # Устанавливаем часовой пояс для Москвы
     moscow_tz = pytz.timezone('Europe/Moscow')
@@ -46,8 +48,8 @@ async def file_complaint(
         f"🚨 *Жалоба на сборщик*\n"
         f"——————————————\n"
         f"👤 *Пользователь:*\n"
-        f"• *VK ID:* `{user_info.get('vk_id') or 'N/A'}`\n"
-        f"• *Имя:* `{user_info.get('full_name') or 'N/A'}`\n\n"
+        f"• *VK ID:* `{vk_user_id or 'N/A'}`\n"
+        f"• *Имя:* `{full_name or 'N/A'}`\n\n"
         f"📋 *Сборщик:*\n"
         f"• *Название:* `{collector.name}`\n"
         f"• *ID:* `{collector.id}`\n"
@@ -58,8 +60,9 @@ async def file_complaint(
         f"📅 *Дата подачи:* {formatted_time or 'N/A'}"
     )
 
-    # Отправляем жалобу в Telegram
+    # Ставим жалобу в очередь на отправку в Telegram
     admin_ids = [settings.admin_id_first, settings.admin_id_second, settings.admin_id_third]
-    await send_telegram_message(message, admin_ids)
+    await enqueue_telegram_messages(db, message, admin_ids)
+    telegram_outbox.wake()
 
     return {"detail": "Complaint successfully submitted"}
\ No newline at end of file
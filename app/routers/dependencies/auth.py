@@ -4,11 +4,13 @@ from fastapi import Depends, HTTPException, status
 from app.core.config import settings
 from app.crud.group import get_group_by_vk_id
 from app.core.database import get_db
+from app.utils.cache import TTLCache
 
 from hashlib import sha256
-from hmac import HMAC
+from hmac import HMAC, compare_digest
 from base64 import b64encode
 from urllib.parse import urlparse, parse_qsl, urlencode
+from typing import NamedTuple
 
 
 async def get_token(authorization: HTTPAuthorizationCredentials = Depends(HTTPBearer())) -> str:
@@ -18,26 +20,26 @@ async def get_token(authorization: HTTPAuthorizationCredentials = Depends(HTTPBe
     return authorization.credentials
 
 
-async def check_valid_token(token: str = Depends(get_token)) -> bool:
+class LaunchParams(NamedTuple):
     """
-    Зависимость для проверки токена
+    Разобранные параметры запуска VK Mini App и результат проверки подписи.
     """
+    params: dict
+    is_valid: bool
+
+
+# Проверенные токены, ключ - подпись sign. Повторные запросы той же сессии
+# мини-приложения не разбирают строку и не пересчитывают HMAC заново.
+_verified_tokens = TTLCache(
+    maxsize=settings.auth_token_cache_size,
+    ttl=settings.auth_token_cache_ttl
+)
+
+
+def _sign_launch_params(query_params: dict) -> str:
     """
-    Функция аутентификации, расшифровывающая по частям
-    строку токена пользователя, а затем сверяющего подпись.
-    Результат сверки подписи возвращается обратно.
+    Вычислить подпись параметров запуска по vk_* параметрам.
     """
-    
-    query_params = dict(
-        parse_qsl(
-            urlparse(token).query,
-            keep_blank_values=True
-        )
-    )
-    
-    if not query_params.get("sign"):
-        return False
-    
     vk_subset = sorted(
         filter(
             lambda key: key.startswith("vk_"),
@@ -56,13 +58,14 @@ async def check_valid_token(token: str = Depends(get_token)) -> bool:
     if hash_code[-1] == "=":
         hash_code = hash_code[:-1]
 
-    fixed_hash = hash_code.replace('+', '-').replace('/', '_')
-    return query_params.get("sign") == fixed_hash
+    return hash_code.replace('+', '-').replace('/', '_')
 
 
-async def get_query_params(token: str = Depends(get_token)) -> dict:
+def parse_launch_params(token: str) -> LaunchParams:
     """
-    Зависимость для получения параметров запроса
+    Функция аутентификации, расшифровывающая по частям
+    строку токена пользователя, а затем сверяющая подпись.
+    Успешно проверенные токены кэшируются по значению подписи.
     """
     query_params = dict(
         parse_qsl(
@@ -70,17 +73,51 @@ async def get_query_params(token: str = Depends(get_token)) -> dict:
             keep_blank_values=True
         )
     )
-    return query_params
+
+    sign = query_params.get("sign")
+    if not sign:
+        return LaunchParams(query_params, False)
+
+    cached = _verified_tokens.get(sign)
+    if cached is not None and cached[0] == token:
+        return cached[1]
+
+    launch_params = LaunchParams(query_params, sign == _sign_launch_params(query_params))
+    if launch_params.is_valid:
+        _verified_tokens.set(sign, (token, launch_params))
+    return launch_params
 
 
-async def verification_group(token_is_valid: bool = Depends(check_valid_token), token: str = Depends(get_token), session: AsyncSession = Depends(get_db)):
+async def get_launch_params(token: str = Depends(get_token)) -> LaunchParams:
+    """
+    Зависимость для разбора и проверки токена.
+    FastAPI кэширует результат в рамках запроса, поэтому токен
+    разбирается один раз, сколько бы зависимостей его ни использовало.
+    """
+    return parse_launch_params(token)
+
+
+async def check_valid_token(launch_params: LaunchParams = Depends(get_launch_params)) -> bool:
+    """
+    Зависимость для проверки токена
+    """
+    return launch_params.is_valid
+
+
+async def get_query_params(launch_params: LaunchParams = Depends(get_launch_params)) -> dict:
+    """
+    Зависимость для получения параметров запроса
+    """
+    return launch_params.params
+
+
+async def verification_group(token_is_valid: bool = Depends(check_valid_token), query_params: dict = Depends(get_query_params), session: AsyncSession = Depends(get_db)):
     """
     Зависимость для проверки токена и получения пользователя
     """
     if not token_is_valid:
-        HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
         
-    query_params = await get_query_params(token)
     group_id = query_params.get("vk_group_id")
     
     if not group_id:
@@ -97,4 +134,17 @@ async def get_group_depend(group: dict = Depends(verification_group)):
     """
     Зависимость для получения пользователя
     """
-    return group
\ No newline at end of file
+    return group
+
+
+async def verify_metrics_token(
+    authorization: HTTPAuthorizationCredentials = Depends(HTTPBearer(auto_error=False))
+) -> None:
+    """
+    Зависимость служебных эндпоинтов метрик: сверяет Bearer-токен с settings.metrics_token.
+    Без настроенного токена эндпоинты отвечают 404, как будто их нет.
+    """
+    if not settings.metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if authorization is None or not compare_digest(authorization.credentials, settings.metrics_token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
@@ -0,0 +1,31 @@
+import hashlib
+from typing import Optional
+from fastapi import Header, Request
+from app.utils.idempotency import IdempotentRequest
+
+
+async def get_idempotency_key(
+    request: Request,
+    idempotency_key: Optional[str] = Header(
+        None,
+        max_length=255,
+        description="Ключ идемпотентности: повтор запроса с тем же ключом вернёт сохранённый ответ"
+    )
+) -> Optional[IdempotentRequest]:
+    """
+    Зависимость для получения ключа идемпотентности из заголовка Idempotency-Key.
+
+    Ключ дополняется методом и путём запроса, чтобы один и тот же ключ
+    в запросах к разным эндпоинтам и коллекторам не давал чужой ответ.
+    Строка запроса и тело хэшируются, чтобы повтор с тем же ключом,
+    но другими данными не получил ответ исходного запроса.
+    """
+    if idempotency_key is None:
+        return None
+    digest = hashlib.sha256(request.url.query.encode())
+    digest.update(b"\n")
+    digest.update(await request.body())
+    return IdempotentRequest(
+        key=f"{request.method} {request.url.path} {idempotency_key}",
+        request_hash=digest.hexdigest()
+    )
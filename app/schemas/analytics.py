@@ -1,3 +1,5 @@
+from datetime import datetime
+from typing import List, Literal
 from pydantic import BaseModel, Field
 
 class CollectorAnalytics(BaseModel):
@@ -14,3 +16,21 @@ class CollectorAnalytics(BaseModel):
             visit_count=200,
             conversion_rate=25.0
         )
+
+
+class CollectorAnalyticsSeries(BaseModel):
+    collector_id: int = Field(..., description="ID коллектора")
+    granularity: Literal["hour", "day"] = Field(..., description="Размер интервала")
+    timestamps: List[datetime] = Field(..., description="Начала интервалов по UTC, по возрастанию")
+    visits: List[int] = Field(..., description="Количество посетителей в каждом интервале")
+    leads: List[int] = Field(..., description="Количество заявок в каждом интервале")
+
+    @classmethod
+    def example(cls):
+        return cls(
+            collector_id=1,
+            granularity="day",
+            timestamps=[datetime(2024, 1, 1), datetime(2024, 1, 2), datetime(2024, 1, 3)],
+            visits=[120, 0, 95],
+            leads=[30, 0, 21]
+        )
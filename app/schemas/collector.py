@@ -73,4 +73,40 @@ class CollectorReadWithVkId(CollectorRead):
             second_bonus="Second bonus",
             third_bonus="Third bonus",
             vk_id="42385843985" 
-        )
\ No newline at end of file
+        )
+
+
+class CollectorPublic(BaseModel):
+    """
+    Публичная карточка коллектора для страницы посетителя.
+    Содержит только редко меняющиеся поля, без счётчиков.
+    """
+    id: int = Field(..., description="Уникальный идентификатор сборщика")
+    name: str = Field(..., description="Название сборщика")
+    description: Optional[str] = Field(None, description="Описание сборщика")
+    transcription: Optional[str] = Field(None, description="Транскрипция названия сборщика")
+    client_path_type: ClientPathType = Field(..., description="Тип пути клиента для получения заявок")
+    client_path: Optional[str] = Field(None, description="Ссылка для получения заявок")
+    plugin: Optional[PluginType] = Field(None, description="Плагин для интеграции, если выбран способ 'Рассылка'")
+    request_phone_numbers: Optional[bool] = Field(False, description="Запрашивать ли номера телефонов у клиентов")
+    first_bonus: Optional[str] = Field(None, description="Первый бонус (50 символов)")
+    second_bonus: Optional[str] = Field(None, description="Второй бонус (50 символов)")
+    third_bonus: Optional[str] = Field(None, description="Третий бонус (50 символов)")
+    vk_id: str = Field(..., description="VK ID обладателя сборщика")
+
+    @classmethod
+    def example(cls):
+        return cls(
+            id=1,
+            name="Collector A",
+            transcription="Collector_1",
+            description="Collector_1 desctiption",
+            client_path_type=ClientPathType.messenger,
+            client_path="https://vk.com/id12434239",
+            plugin=PluginType.vkontakte,
+            request_phone_numbers=False,
+            first_bonus="First bonus",
+            second_bonus="Second bonus",
+            third_bonus="Third bonus",
+            vk_id="42385843985"
+        )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import List, Optional
 
 class LeadBase(BaseModel):
     phone: Optional[str] = Field(None, description="Номер телефона лида")
@@ -24,3 +24,31 @@ class LeadRead(LeadBase):
             full_name="John Doe",
             photo=None
         )
+
+
+class LeadImportResult(BaseModel):
+    rows: int = Field(..., description="Количество строк в файле")
+    leads_created: int = Field(..., description="Количество новых лидов")
+    visits_recorded: int = Field(..., description="Количество новых или обновлённых записей о переходах")
+    requests_added: int = Field(..., description="Количество новых заявок, добавленных к счётчику коллектора")
+
+    @classmethod
+    def example(cls):
+        return cls(
+            rows=3,
+            leads_created=2,
+            visits_recorded=3,
+            requests_added=1
+        )
+
+
+class LeadPage(BaseModel):
+    items: List[LeadRead] = Field(..., description="Лиды на странице")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы или null, если страница последняя")
+
+    @classmethod
+    def example(cls):
+        return cls(
+            items=[LeadRead.example()],
+            next_cursor="WyIyMDI0LTA1LTAxVDEwOjAwOjAwIiwgMV0"
+        )
@@ -0,0 +1,58 @@
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud.analytics import get_collector_analytics, get_group_analytics, period_start
+from app.schemas.analytics import CollectorAnalytics
+from app.utils.cache import SingleFlightCache
+
+# Аналитика коллекторов и групп. Дашборд, открытый по ссылке многими людьми,
+# присылает одинаковые запросы почти одновременно, и их обслуживает один
+# запрос к базе. Вычисление открывает свою сессию: его результат ждут
+# и другие запросы, а не только запустивший его
+analytics_cache = SingleFlightCache(maxsize=settings.analytics_cache_size, ttl=settings.analytics_cache_ttl)
+
+
+async def get_cached_group_analytics(group_id: int, period: Optional[str] = None) -> List[CollectorAnalytics]:
+    """
+    Аналитика всех коллекторов группы из кэша.
+
+    :raises ValueError: Если период неизвестен.
+    """
+    period_start(period)
+
+    async def load():
+        async with SessionLocal() as session:
+            return await get_group_analytics(session, group_id, period)
+
+    # Аналитика группы зависит от всех её коллекторов
+    return await analytics_cache.get_or_load(
+        ("group", group_id, period),
+        load,
+        value_tags=lambda analytics: [collector.collector_id for collector in analytics]
+    )
+
+
+async def get_cached_collector_analytics(
+    collector_id: int, group_id: int, period: Optional[str] = None
+) -> Optional[CollectorAnalytics]:
+    """
+    Аналитика коллектора группы из кэша.
+
+    :return: Аналитика или None, если коллектор не найден в группе.
+    :raises ValueError: Если период неизвестен.
+    """
+    period_start(period)
+
+    async def load():
+        async with SessionLocal() as session:
+            return await get_collector_analytics(session, collector_id, group_id, period)
+
+    return await analytics_cache.get_or_load(("collector", group_id, collector_id, period), load, tags=[collector_id])
+
+
+def invalidate_collector_analytics(collector_id: int) -> None:
+    """
+    Удалить из кэша аналитику коллектора и групп, в которые он входит.
+    """
+    analytics_cache.invalidate(collector_id)
@@ -0,0 +1,176 @@
+import asyncio
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру LRU-кэш с временем жизни записей.
+
+    Кэш живёт внутри процесса воркера и не разделяется между процессами,
+    поэтому TTL задаёт максимальное время, в течение которого другой
+    процесс может видеть устаревшее значение.
+
+    :param maxsize: Максимальное количество записей.
+    :param ttl: Время жизни записи в секундах.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+
+        expires_at, value = item
+        if expires_at <= monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def discard_if(self, predicate: Callable[[Hashable, Any], bool]) -> None:
+        """
+        Удалить все записи, для которых predicate(key, value) истинен.
+        """
+        for key in [k for k, (_, v) in self._data.items() if predicate(k, v)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MISSING = object()
+
+
+class SingleFlightCache:
+    """
+    TTL-кэш результатов асинхронных вычислений с защитой от лавины запросов.
+
+    Одновременные промахи по одному ключу ждут одно вычисление, а не
+    запускают каждый своё. Вычисление выполняется в отдельной задаче,
+    поэтому отмена запроса, который его запустил, не отменяет его для
+    остальных.
+
+    Записи помечаются тегами, и invalidate удаляет только записи и идущие
+    вычисления с нужными тегами, находя их по индексу тег -> ключи без
+    перебора кэша. Результат вычисления, во время которого инвалидировали
+    один из его тегов, не сохраняется: он мог быть получен по уже
+    устаревшим данным. Размер индекса и номеров инвалидаций ограничен
+    количеством различных тегов и ключей.
+
+    :param maxsize: Максимальное количество записей.
+    :param ttl: Время жизни записи в секундах.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._keys: Dict[Hashable, Set[Hashable]] = {}
+        # Номер последней инвалидации каждого тега
+        self._invalidated: Dict[Hashable, int] = {}
+        self._sequence = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_load(
+            self,
+            key: Hashable,
+            load: Callable[[], Awaitable[Any]],
+            tags: Iterable[Hashable] = (),
+            value_tags: Optional[Callable[[Any], Iterable[Hashable]]] = None
+    ) -> Any:
+        """
+        Значение из кэша или результат load(), общий для одновременных запросов.
+
+        :param tags: Теги записи, известные до вычисления.
+        :param value_tags: Функция, возвращающая теги по вычисленному значению.
+        """
+        value = self._cache.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            tags = tuple(tags)
+            self._index(key, tags)
+            task = asyncio.ensure_future(self._load(key, load, tags, value_tags))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _load(
+            self,
+            key: Hashable,
+            load: Callable[[], Awaitable[Any]],
+            tags: Tuple[Hashable, ...],
+            value_tags: Optional[Callable[[Any], Iterable[Hashable]]]
+    ) -> Any:
+        started = self._sequence
+        value = await load()
+        if value_tags is not None:
+            tags = (*tags, *value_tags(value))
+            self._index(key, tags)
+        if all(self._invalidated.get(tag, 0) <= started for tag in tags):
+            self._cache.set(key, value)
+        return value
+
+    def _index(self, key: Hashable, tags: Iterable[Hashable]) -> None:
+        for tag in tags:
+            self._keys.setdefault(tag, set()).add(key)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Ошибку получают ожидающие запросы, здесь она только помечается
+            # полученной, если ждать было некому
+            task.exception()
+
+    def invalidate(self, *tags: Hashable) -> None:
+        """
+        Удалить записи с любым из тегов.
+
+        Идущие вычисления этих записей не попадут в кэш, а новые запросы
+        запустят вычисление заново.
+        """
+        self._sequence += 1
+        for tag in tags:
+            self._invalidated[tag] = self._sequence
+            for key in self._keys.pop(tag, ()):
+                self._cache.pop(key)
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / requests if requests else 0.0,
+            "size": len(self._cache),
+            "inflight": len(self._inflight),
+        }
@@ -1,65 +1,135 @@
-from app.core.config import settings
+from app.integrations.vk import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, vk_scheduler
 
+import asyncio
 import httpx
+from typing import Dict, List, Optional, Set
 
-def get_user_full_name(user_id: int) -> str:
+# users.get принимает не более 1000 идентификаторов за вызов
+VK_USERS_GET_MAX_IDS = 1000
+
+
+class VKUserNotFound(RuntimeError):
+    """
+    VK не вернул профиль пользователя: он удалён, заблокирован или не существует.
     """
-    Получить полное имя пользователя ВКонтакте.
 
-    :param user_id: ID пользователя VK.
-    :return: Полное имя пользователя (ФИО) в формате "Имя Фамилия".
+
+async def _fetch_users(
+    user_ids: List[str],
+    client: Optional[httpx.AsyncClient] = None,
+    priority: int = PRIORITY_INTERACTIVE
+) -> List[dict]:
     """
-    params = {
-        "user_ids": user_id,
-        "access_token": settings.application_secret_key,
-        "v": "5.131"
-    }
-    
-    try:
-        response = httpx.get("https://api.vk.com/method/users.get", params=params)
-        response.raise_for_status()  # Поднимает исключение, если статус код не 200
-        data = response.json()
-
-        if "response" in data:
-            user_info = data["response"][0]
-            full_name = f"{user_info['first_name']} {user_info['last_name']}"
-            return full_name
-        else:
-            error_message = data.get("error", {}).get("error_msg", "Unknown error")
-            raise ValueError(f"API Error: {error_message}")
-    except Exception as e:
-        raise RuntimeError(f"Failed to fetch user full name: {e}")
-    
-
-async def get_user_info(user_id: int) -> dict:
+    Загрузить профили пользователей одним вызовом users.get.
+
+    :param user_ids: Список ID пользователей VK (не более 1000).
+    :param client: HTTP-клиент, по умолчанию общий клиент приложения.
+    :param priority: Приоритет запроса в планировщике VK API.
+    :return: Список профилей в формате ответа VK.
     """
-    Получить информацию о пользователе ВКонтакте.
+    return await vk_scheduler.call(
+        "users.get",
+        {
+            "user_ids": ",".join(user_ids),
+            "fields": "photo_200",  # Указываем поле для фотографии
+        },
+        priority=priority,
+        client=client
+    )
 
-    :param user_id: ID пользователя VK.
-    :return: Словарь с полным именем, vk_id и ссылкой на фото.
+
+class VKUserLoader:
+    """
+    Пакетный загрузчик профилей VK в стиле dataloader.
+
+    Все vk_id, запрошенные в пределах одного тика event loop, собираются
+    вместе и загружаются минимальным числом вызовов users.get с несколькими
+    user_ids. Результаты раздаются обратно вызвавшим корутинам.
+
+    :param client: HTTP-клиент, по умолчанию общий клиент приложения.
+    :param priority: Приоритет вызовов users.get в планировщике VK API.
     """
-    params = {
-        "user_ids": user_id,
-        "fields": "photo_200",  # Указываем поле для фотографии
-        "access_token": settings.application_secret_key,
-        "v": "5.131"
-    }
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get("https://api.vk.com/method/users.get", params=params)
-            response.raise_for_status()
-            data = response.json()
-
-        if "response" in data:
-            user_info = data["response"][0]
-            return {
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, priority: int = PRIORITY_INTERACTIVE):
+        self._client = client
+        self._priority = priority
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._dispatch_scheduled = False
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self, user_id) -> dict:
+        """
+        Получить профиль пользователя VK.
+
+        :param user_id: ID пользователя VK.
+        :return: Словарь с полным именем, vk_id и ссылкой на фото.
+        :raises RuntimeError: Если профиль не удалось получить.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(str(user_id), []).append(future)
+
+        if not self._dispatch_scheduled:
+            self._dispatch_scheduled = True
+            loop.call_soon(self._dispatch)
+        return await future
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        self._dispatch_scheduled = False
+
+        user_ids = list(pending)
+        for i in range(0, len(user_ids), VK_USERS_GET_MAX_IDS):
+            batch = {user_id: pending[user_id] for user_id in user_ids[i:i + VK_USERS_GET_MAX_IDS]}
+            task = asyncio.create_task(self._resolve(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, batch: Dict[str, List[asyncio.Future]]) -> None:
+        try:
+            users = await _fetch_users(list(batch), self._client, self._priority)
+        except Exception as e:
+            error = RuntimeError(f"Failed to fetch user info: {e}")
+            for futures in batch.values():
+                _set_exception(futures, error)
+            return
+
+        users_by_id = {str(user["id"]): user for user in users}
+        for user_id, futures in batch.items():
+            user_info = users_by_id.get(user_id)
+            if user_info is None:
+                _set_exception(futures, VKUserNotFound(f"Failed to fetch user info: user {user_id} not found"))
+                continue
+
+            result = {
                 "vk_id": user_info["id"],
                 "full_name": f"{user_info['first_name']} {user_info['last_name']}",
                 "photo_200": user_info.get("photo_200", None)
             }
-        else:
-            error_message = data.get("error", {}).get("error_msg", "Unknown error")
-            raise ValueError(f"API Error: {error_message}")
-    except Exception as e:
-        raise RuntimeError(f"Failed to fetch user info: {e}")
+            for future in futures:
+                if not future.done():
+                    future.set_result(result)
+
+
+def _set_exception(futures: List[asyncio.Future], error: Exception) -> None:
+    for future in futures:
+        if not future.done():
+            future.set_exception(error)
+
+
+user_loader = VKUserLoader()
+# Фоновое обогащение профилей не должно вытеснять запросы пользователей
+background_user_loader = VKUserLoader(priority=PRIORITY_BACKGROUND)
+
+
+async def get_user_info(user_id: int, background: bool = False) -> dict:
+    """
+    Получить информацию о пользователе ВКонтакте.
+    Запросы, сделанные одновременно, объединяются в один вызов users.get.
+
+    :param user_id: ID пользователя VK.
+    :param background: Запрос из фоновой задачи, обслуживается после интерактивных.
+    :return: Словарь с полным именем, vk_id и ссылкой на фото.
+    """
+    loader = background_user_loader if background else user_loader
+    return await loader.load(user_id)
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.idempotency_key import release_idempotency_key, reserve_idempotency_key, save_idempotent_response
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotentRequest(NamedTuple):
+    """
+    Запрос с заголовком Idempotency-Key.
+
+    :param key: Ключ с методом и путём запроса.
+    :param request_hash: SHA-256 строки запроса и тела.
+    """
+    key: str
+    request_hash: str
+
+
+class IdempotencyStore:
+    """
+    Хранилище ответов по ключам идемпотентности (заголовок Idempotency-Key).
+
+    Успешный ответ запоминается в ограниченном кэше процесса и, если включено,
+    в таблице idempotency_keys, чтобы повтор запроса, попавший в другой
+    процесс, тоже получил сохранённый ответ без обращения к таблицам лидов.
+
+    Ответ отдаётся только повтору с тем же телом и строкой запроса, иначе 422.
+    На время выполнения запроса ключ занят: повтор в том же процессе ждёт
+    его окончания, повтор в другом процессе получает 409.
+
+    :param maxsize: Максимальное количество ответов в кэше процесса.
+    :param ttl: Время хранения ответа в секундах.
+    :param use_db: Хранить ответы также в базе данных.
+    :param pending_timeout: Через сколько секунд ключ незавершённого запроса считается брошенным.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, use_db: bool, pending_timeout: float):
+        self.ttl = ttl
+        self.use_db = use_db
+        self.pending_timeout = pending_timeout
+        self._responses = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Ключи запросов, выполняющихся в этом процессе
+        self._inflight: Dict[str, Tuple[str, asyncio.Event]] = {}
+
+    @asynccontextmanager
+    async def reserve(self, db: AsyncSession, request: Optional[IdempotentRequest]) -> AsyncIterator[Optional[Response]]:
+        """
+        Занять ключ на время выполнения запроса.
+
+        Возвращает сохранённый ответ, если запрос с этим ключом уже выполнен,
+        иначе None, и тогда ответ нужно сохранить через respond. Если запрос
+        завершился без ответа (исключением), ключ освобождается.
+        """
+        if request is None:
+            yield None
+            return
+
+        key, request_hash = request
+        while True:
+            cached = self._responses.get(key)
+            if cached is not None:
+                yield self._replay(request_hash, *cached)
+                return
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self._check_hash(request_hash, inflight[0])
+            await inflight[1].wait()
+
+        done = asyncio.Event()
+        self._inflight[key] = (request_hash, done)
+        reserved = False
+        try:
+            if self.use_db:
+                stored = await reserve_idempotency_key(
+                    db, key, request_hash,
+                    max_age=timedelta(seconds=self.ttl),
+                    pending_timeout=timedelta(seconds=self.pending_timeout)
+                )
+                if stored is not None:
+                    stored_hash, status_code, body = stored
+                    self._check_hash(request_hash, stored_hash)
+                    if status_code is None:
+                        raise HTTPException(
+                            status_code=status.HTTP_409_CONFLICT,
+                            detail="A request with this Idempotency-Key is still in progress.",
+                            headers={"Retry-After": "1"}
+                        )
+                    self._responses.set(key, (stored_hash, status_code, body))
+                    yield self._replay(request_hash, stored_hash, status_code, body)
+                    return
+            reserved = True
+            yield None
+        finally:
+            del self._inflight[key]
+            done.set()
+            if reserved and self.use_db and self._responses.get(key) is None:
+                try:
+                    await db.rollback()
+                    await release_idempotency_key(db, key)
+                except Exception:
+                    # Ключ освободится сам через pending_timeout
+                    logger.exception("Failed to release idempotency key=%s", key)
+
+    async def respond(
+        self, db: AsyncSession, request: IdempotentRequest, status_code: int, model: Optional[BaseModel] = None
+    ) -> Response:
+        """
+        Сохранить ответ по ключу и вернуть его.
+
+        :param status_code: HTTP-статус ответа.
+        :param model: Тело ответа или None для ответа без тела.
+        """
+        key, request_hash = request
+        body = model.model_dump_json().encode() if model is not None else b""
+        self._responses.set(key, (request_hash, status_code, body))
+        if self.use_db:
+            try:
+                await save_idempotent_response(db, key, status_code, body)
+            except Exception:
+                # Запрос уже выполнен, повтор в этот процесс ответит из кэша
+                logger.exception("Failed to store idempotent response key=%s", key)
+                await db.rollback()
+        return self._response(status_code, body)
+
+    def _replay(self, request_hash: str, stored_hash: str, status_code: int, body: bytes) -> Response:
+        self._check_hash(request_hash, stored_hash)
+        return self._response(status_code, body, replayed=True)
+
+    @staticmethod
+    def _check_hash(request_hash: str, stored_hash: str) -> None:
+        if request_hash != stored_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request."
+            )
+
+    @staticmethod
+    def _response(status_code: int, body: bytes, replayed: bool = False) -> Response:
+        headers = {"Idempotent-Replayed": "true"} if replayed else None
+        media_type = "application/json" if body else None
+        return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+idempotency_store = IdempotencyStore(
+    maxsize=settings.idempotency_cache_size,
+    ttl=settings.idempotency_key_ttl,
+    use_db=settings.idempotency_db_enabled,
+    pending_timeout=settings.idempotency_pending_timeout
+)
@@ -0,0 +1,186 @@
+import codecs
+import csv
+import io
+import json
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Tuple
+
+# Колонки файла импорта лидов. Обязательна только vk_id
+IMPORT_COLUMNS = ("vk_id", "phone", "full_name", "request_form", "datetime_request")
+
+# Форматы файлов по Content-Type
+CSV_MEDIA_TYPE = "text/csv"
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson")
+
+_TRUE_VALUES = {"1", "true", "yes", "y", "t", "да"}
+
+
+class LeadImportError(ValueError):
+    """
+    Ошибка в строке файла импорта лидов.
+    """
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Разбить поток байтов в UTF-8 на строки, не читая его целиком.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail.rstrip("\r")
+
+
+def _import_record(line: int, row: dict) -> Tuple:
+    vk_id = str(row.get("vk_id") or "").strip()
+    if not vk_id:
+        raise LeadImportError(line, "vk_id is required")
+
+    phone = row.get("phone") or None
+    full_name = row.get("full_name") or None
+
+    request_form = row.get("request_form")
+    if isinstance(request_form, str):
+        request_form = request_form.strip().lower() in _TRUE_VALUES
+    datetime_request = row.get("datetime_request") or None
+    if datetime_request is not None:
+        try:
+            value = str(datetime_request).strip()
+            # fromisoformat до Python 3.11 не принимает суффикс Z
+            if value[-1:] in ("Z", "z"):
+                value = value[:-1] + "+00:00"
+            datetime_request = datetime.fromisoformat(value)
+        except ValueError:
+            raise LeadImportError(line, "datetime_request must be an ISO 8601 datetime")
+        if datetime_request.tzinfo is not None:
+            datetime_request = datetime_request.replace(tzinfo=None) - datetime_request.utcoffset()
+        # Время заявки без флага означает, что заявка отправлена
+        request_form = True
+
+    return (
+        vk_id,
+        str(phone) if phone is not None else None,
+        str(full_name) if full_name is not None else None,
+        bool(request_form),
+        datetime_request
+    )
+
+
+class _LineFeed:
+    """
+    Итератор строк для csv.reader, который пополняется по мере чтения потока.
+    """
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def parse_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple]:
+    """
+    Записи импорта из CSV с заголовком.
+
+    Строки потока передаются одному csv.reader, поэтому поля в кавычках
+    могут содержать переводы строк. Запись разбирается, когда число кавычек
+    в её строках чётное, то есть последнее поле в кавычках закрыто.
+    """
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    header = None
+    line_number = 0
+    record_line = 0
+    quotes = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not feed.lines:
+            record_line = line_number
+        feed.lines.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        quotes = 0
+        try:
+            values = next(reader)
+        except csv.Error as e:
+            raise LeadImportError(record_line, str(e))
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            if "vk_id" not in header:
+                raise LeadImportError(record_line, "header must contain vk_id column")
+            continue
+        if len(values) > len(header):
+            raise LeadImportError(record_line, "too many columns")
+        yield _import_record(record_line, dict(zip(header, values)))
+
+    if feed.lines:
+        raise LeadImportError(record_line, "unterminated quoted field")
+
+
+async def parse_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple]:
+    """
+    Записи импорта из NDJSON: один JSON-объект на строку.
+    """
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise LeadImportError(line_number, "invalid JSON")
+        if not isinstance(row, dict):
+            raise LeadImportError(line_number, "expected a JSON object")
+        yield _import_record(line_number, row)
+
+
+# Колонки выгрузки лидов
+EXPORT_COLUMNS = ("vk_id", "full_name", "phone", "photo", "request_form", "datetime_request")
+
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def csv_header() -> bytes:
+    return encode_csv([EXPORT_COLUMNS])
+
+
+def encode_csv(rows) -> bytes:
+    """
+    Закодировать пачку строк выгрузки в CSV.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_export_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def encode_ndjson(rows) -> bytes:
+    """
+    Закодировать пачку строк выгрузки в NDJSON.
+    """
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, map(_export_value, row))), ensure_ascii=False) + "\n"
+        for row in rows
+    ).encode()
@@ -0,0 +1,53 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+def encode_lead_cursor(datetime_request: Optional[datetime], lead_id: int) -> str:
+    """
+    Непрозрачный курсор страницы лидов: позиция последнего лида страницы.
+    """
+    payload = json.dumps([datetime_request.isoformat() if datetime_request else None, lead_id])
+    return urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_lead_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """
+    Разобрать курсор страницы лидов.
+
+    :raises ValueError: Если курсор повреждён.
+    """
+    try:
+        payload = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        datetime_request, lead_id = json.loads(payload)
+        datetime_request = datetime.fromisoformat(datetime_request) if datetime_request is not None else None
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(lead_id, int):
+        raise ValueError("Invalid cursor")
+    return datetime_request, lead_id
+
+
+def encode_lead_rank_cursor(similarity: float, lead_id: int) -> str:
+    """
+    Курсор страницы результатов поиска, отсортированных по похожести.
+    """
+    payload = json.dumps([similarity, lead_id])
+    return urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_lead_rank_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    Разобрать курсор страницы результатов поиска по похожести.
+
+    :raises ValueError: Если курсор повреждён.
+    """
+    try:
+        payload = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        similarity, lead_id = json.loads(payload)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(similarity, (int, float)) or isinstance(similarity, bool) or not isinstance(lead_id, int):
+        raise ValueError("Invalid cursor")
+    return float(similarity), lead_id
@@ -0,0 +1,21 @@
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud.counter import compact_counters
+from app.crud.group import invalidate_group_cache
+from app.workers.base import PeriodicWorker
+
+
+class CounterCompactor(PeriodicWorker):
+    """
+    Периодическое сворачивание шардов счётчиков в collectors.count_leads
+    и groups.collector_count.
+    """
+
+    async def run_once(self) -> None:
+        async with SessionLocal() as session:
+            group_ids = await compact_counters(session)
+        for group_id in group_ids:
+            invalidate_group_cache(group_id)
+
+
+counter_compactor = CounterCompactor(interval=settings.counter_compact_interval)
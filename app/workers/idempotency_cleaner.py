@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud.idempotency_key import delete_expired_idempotency_keys
+from app.workers.base import PeriodicWorker
+
+
+class IdempotencyKeyCleaner(PeriodicWorker):
+    """
+    Периодическое удаление устаревших ключей идемпотентности из базы.
+    """
+
+    def __init__(self, interval: float, max_age: timedelta):
+        super().__init__(interval)
+        self.max_age = max_age
+
+    async def run_once(self) -> None:
+        async with SessionLocal() as session:
+            await delete_expired_idempotency_keys(session, self.max_age)
+
+
+idempotency_key_cleaner = IdempotencyKeyCleaner(
+    interval=settings.idempotency_cleanup_interval,
+    max_age=timedelta(seconds=settings.idempotency_key_ttl)
+)
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from typing import Optional, Set
+
+from app.core.database import SessionLocal
+from app.crud.vk_profile import refresh_vk_profiles
+
+logger = logging.getLogger(__name__)
+
+
+class LeadEnrichmentWorker:
+    """
+    Фоновое дозаполнение имён лидов из VK.
+
+    Лид создаётся сразу с именем-заглушкой, а его vk_id ставится в очередь.
+    Воркер забирает vk_id из очереди, запрашивает профиль в VK, сохраняет его
+    в vk_profiles и обновляет Lead.full_name, не задерживая запрос посетителя.
+
+    :param maxsize: Максимальный размер очереди. При переполнении vk_id
+        отбрасывается, а профиль позже загрузит VkProfileRefresher.
+    :param batch_size: Максимальное число лидов, обрабатываемых за один проход.
+    """
+
+    def __init__(self, maxsize: int = 10000, batch_size: int = 1000):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def enqueue(self, vk_id: str) -> bool:
+        """
+        Поставить лида в очередь на дозаполнение.
+
+        :return: False, если воркер не запущен или очередь переполнена.
+        """
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait(vk_id)
+        except asyncio.QueueFull:
+            logger.warning("Lead enrichment queue is full, dropping vk_id=%s", vk_id)
+            return False
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            # Забираем всё, что накопилось в очереди, чтобы загрузить профили пачкой
+            vk_ids = {await self._queue.get()}
+            while not self._queue.empty() and len(vk_ids) < self.batch_size:
+                vk_ids.add(self._queue.get_nowait())
+            try:
+                await self._enrich(vk_ids)
+            except Exception:
+                logger.exception("Failed to enrich leads vk_ids=%s", sorted(vk_ids))
+
+    async def _enrich(self, vk_ids: Set[str]) -> None:
+        async with SessionLocal() as session:
+            await refresh_vk_profiles(session, list(vk_ids))
+
+
+lead_enrichment = LeadEnrichmentWorker()
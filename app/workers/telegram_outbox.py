@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import random
+from datetime import timedelta
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud.telegram_outbox import (
+    claim_due_telegram_messages,
+    mark_telegram_message_sent,
+    reschedule_telegram_message
+)
+from app.integrations.telegram import TelegramRetryAfter, deliver_telegram_message
+from app.workers.base import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramOutboxWorker(PeriodicWorker):
+    """
+    Доставка сообщений из таблицы telegram_outbox.
+
+    Сообщения пачки отправляются в Telegram одновременно. На ответ 429
+    отправка откладывается на retry_after, на остальные ошибки - с
+    экспоненциальной задержкой. После max_attempts попыток сообщение
+    помечается как failed.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        batch_size: int,
+        max_attempts: int,
+        lease: timedelta,
+        backoff_base: float,
+        backoff_max: float
+    ):
+        super().__init__(interval)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    async def run_once(self) -> None:
+        async with SessionLocal() as session:
+            while True:
+                messages = await claim_due_telegram_messages(session, self.batch_size, self.lease)
+                if not messages:
+                    return
+
+                results = await asyncio.gather(
+                    *(deliver_telegram_message(message.chat_id, message.message) for message in messages),
+                    return_exceptions=True
+                )
+                for message, result in zip(messages, results):
+                    if result is None:
+                        await mark_telegram_message_sent(session, message.id)
+                    elif isinstance(result, TelegramRetryAfter):
+                        await reschedule_telegram_message(
+                            session, message.id, timedelta(seconds=result.retry_after), str(result)
+                        )
+                    else:
+                        logger.warning("Telegram delivery to %s failed: %s", message.chat_id, result)
+                        await reschedule_telegram_message(
+                            session, message.id, self._backoff(message.attempts), str(result),
+                            give_up=message.attempts >= self.max_attempts
+                        )
+                await session.commit()
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+
+telegram_outbox = TelegramOutboxWorker(
+    interval=settings.telegram_outbox_poll_interval,
+    batch_size=settings.telegram_outbox_batch_size,
+    max_attempts=settings.telegram_outbox_max_attempts,
+    lease=timedelta(seconds=settings.telegram_outbox_lease),
+    backoff_base=settings.telegram_outbox_backoff_base,
+    backoff_max=settings.telegram_outbox_backoff_max
+)
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud.lead import create_lead_visit, record_lead_visits
+
+logger = logging.getLogger(__name__)
+
+
+class VisitBuffer:
+    """
+    Буфер переходов лидов для режима приёма lead_ingest_mode="buffered".
+
+    Эндпоинт только кладёт переход в очередь и сразу отвечает, а воркер
+    записывает накопленные переходы пачками: как только набралось batch_size
+    переходов или прошло flush_interval секунд с первого из них.
+    Очередь ограничена, при переполнении add возвращает False, и эндпоинт
+    отвечает 503. При остановке буфер дописывает всё, что в нём осталось.
+    Неудачная запись пачки повторяется flush_retries раз, после чего
+    переходы пачки записываются по одному.
+
+    :param maxsize: Максимальное количество переходов в очереди.
+    :param batch_size: Максимальное количество переходов в одной записи.
+    :param flush_interval: Максимальное время ожидания пачки в секундах.
+    :param flush_retries: Количество повторов неудачной записи пачки.
+    :param retry_delay: Задержка перед первым повтором в секундах, далее удваивается.
+    """
+
+    def __init__(
+            self,
+            maxsize: int,
+            batch_size: int,
+            flush_interval: float,
+            flush_retries: int,
+            retry_delay: float
+    ):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.flush_retries = flush_retries
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Пачка, которую воркер собирает или записывает прямо сейчас
+        self._pending: List[Tuple[str, int]] = []
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        # Новые переходы больше не принимаются, остаток дописываем.
+        # Незаконченная пачка воркера могла быть уже записана,
+        # повторная запись безопасна благодаря ON CONFLICT DO NOTHING
+        queue, self._queue = self._queue, None
+        if self._pending:
+            await self._flush(self._pending)
+            self._pending = []
+        while not queue.empty():
+            batch = [queue.get_nowait() for _ in range(min(self.batch_size, queue.qsize()))]
+            await self._flush(batch)
+
+    def add(self, vk_id: str, collector_id: int) -> bool:
+        """
+        Поставить переход в очередь на запись.
+
+        :return: False, если буфер не запущен или переполнен.
+        """
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait((vk_id, collector_id))
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def qsize(self) -> int:
+        return 0 if self._queue is None else self._queue.qsize()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._pending = batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self._queue.get_nowait())
+            await self._flush(batch)
+            self._pending = []
+
+    async def _flush(self, batch: List[Tuple[str, int]]) -> None:
+        # Клиент уже получил ответ, поэтому пачка не отбрасывается при первой ошибке.
+        # Повторная запись безопасна благодаря ON CONFLICT DO NOTHING
+        delay = self.retry_delay
+        for attempt in range(self.flush_retries + 1):
+            try:
+                async with SessionLocal() as session:
+                    await record_lead_visits(session, batch)
+                return
+            except Exception:
+                logger.exception(
+                    "Failed to record %d buffered lead visits (attempt %d)", len(batch), attempt + 1
+                )
+            if attempt < self.flush_retries:
+                await asyncio.sleep(delay)
+                delay *= 2
+
+        # Пачка целиком не записывается: пишем переходы по одному,
+        # чтобы один проблемный переход не потянул за собой остальные
+        failed = 0
+        for vk_id, collector_id in batch:
+            try:
+                async with SessionLocal() as session:
+                    await create_lead_visit(session, vk_id, collector_id)
+            except Exception:
+                failed += 1
+                logger.exception("Failed to record lead visit %s -> %d", vk_id, collector_id)
+        if failed:
+            logger.error("Dropped %d of %d buffered lead visits", failed, len(batch))
+
+
+visit_buffer = VisitBuffer(
+    maxsize=settings.lead_ingest_buffer_size,
+    batch_size=settings.lead_ingest_batch_size,
+    flush_interval=settings.lead_ingest_flush_interval,
+    flush_retries=settings.lead_ingest_flush_retries,
+    retry_delay=settings.lead_ingest_retry_delay
+)
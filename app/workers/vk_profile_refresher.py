@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud.vk_profile import get_stale_vk_ids, refresh_vk_profiles
+from app.workers.base import PeriodicWorker
+
+
+class VkProfileRefresher(PeriodicWorker):
+    """
+    Периодическая загрузка недостающих и обновление устаревших профилей VK.
+
+    За проход обрабатывается не больше batch_size профилей, которые
+    загружаются из VK пачкой через users.get.
+    """
+
+    def __init__(self, interval: float, max_age: timedelta, batch_size: int):
+        super().__init__(interval)
+        self.max_age = max_age
+        self.batch_size = batch_size
+
+    async def run_once(self) -> None:
+        async with SessionLocal() as session:
+            vk_ids = await get_stale_vk_ids(session, self.max_age, self.batch_size)
+            if vk_ids:
+                await refresh_vk_profiles(session, vk_ids)
+
+
+vk_profile_refresher = VkProfileRefresher(
+    interval=settings.vk_profile_refresh_interval,
+    max_age=timedelta(seconds=settings.vk_profile_max_age),
+    batch_size=settings.vk_profile_refresh_batch
+)
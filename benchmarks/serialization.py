@@ -0,0 +1,116 @@
+"""
+Сравнение стоимости сериализации ответа на один элемент списка.
+
+До: crud строит модели из строк (CollectorRead(**row), LeadRead(...)),
+затем response_model проверяет их ещё раз (serialize_response).
+После: crud отдаёт строки как есть, и их проверяет только response_model.
+В обоих случаях итог кодирует FastJSONResponse (orjson).
+
+Запуск из корня репозитория:
+    python -m benchmarks.serialization [количество элементов]
+"""
+import asyncio
+import sys
+from time import perf_counter
+from typing import List, NamedTuple
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.responses import FastJSONResponse
+from app.models.collector import ClientPathType, PluginType
+from app.schemas.collector import CollectorRead
+from app.schemas.lead import LeadPage, LeadRead
+
+
+class CollectorRow(NamedTuple):
+    # Как и Row SQLAlchemy, даёт доступ к колонкам по атрибутам
+    id: int
+    name: str
+    description: str
+    transcription: str
+    client_path_type: ClientPathType
+    client_path: str
+    plugin: PluginType
+    count_leads: int
+    request_phone_numbers: bool
+    first_bonus: str
+    second_bonus: str
+    third_bonus: str
+
+
+class LeadRow(NamedTuple):
+    id: int
+    phone: str
+    vk_id: str
+    full_name: str
+    photo: str
+
+
+def collector_rows(count: int) -> List[CollectorRow]:
+    return [
+        CollectorRow(
+            id=i,
+            name=f"Сборщик {i}",
+            description="Описание сборщика",
+            transcription=None,
+            client_path_type=ClientPathType.MESSENGER,
+            client_path="https://vk.com/im",
+            plugin=PluginType.SENLER,
+            count_leads=i * 10,
+            request_phone_numbers=False,
+            first_bonus="Бонус",
+            second_bonus=None,
+            third_bonus=None
+        )
+        for i in range(count)
+    ]
+
+
+def lead_rows(count: int) -> List[LeadRow]:
+    return [LeadRow(i, "+79001234567", str(i), f"Лид {i}", None) for i in range(count)]
+
+
+async def collectors_models(rows: List[CollectorRow], field) -> bytes:
+    content = [CollectorRead(**row._asdict()) for row in rows]
+    return FastJSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+async def collectors_rows(rows: List[CollectorRow], field) -> bytes:
+    return FastJSONResponse(await serialize_response(field=field, response_content=rows)).body
+
+
+async def page_models(rows: List[LeadRow], field) -> bytes:
+    content = LeadPage(items=[LeadRead(**row._asdict()) for row in rows], next_cursor=None)
+    return FastJSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+async def page_rows(rows: List[LeadRow], field) -> bytes:
+    content = {"items": rows, "next_cursor": None}
+    return FastJSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+async def measure(func, rows, field, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = perf_counter()
+        await func(rows, field)
+        best = min(best, perf_counter() - started)
+    return best / len(rows) * 1_000_000
+
+
+async def main(count: int) -> None:
+    cases = [
+        ("collectors list", collector_rows(count), List[CollectorRead], collectors_models, collectors_rows),
+        ("lead page", lead_rows(count), LeadPage, page_models, page_rows),
+    ]
+    print(f"{'case':<18}{'models':>10}{'rows':>10}{'speedup':>10}   (us/item)")
+    for name, rows, response_type, slow, fast in cases:
+        field = create_model_field(name="Response", type_=response_type, mode="serialization")
+        slow_cost = await measure(slow, rows, field)
+        fast_cost = await measure(fast, rows, field)
+        print(f"{name:<18}{slow_cost:>10.2f}{fast_cost:>10.2f}{slow_cost / fast_cost:>9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000))
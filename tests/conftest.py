@@ -0,0 +1,63 @@
+"""
+Общие фикстуры тестов.
+
+Тесты работают с базой из DATABASE_URL (и остальными переменными окружения
+приложения, как в .env): таблицы и миграции применяет запуск приложения.
+Используйте отдельную тестовую базу. Тесты не очищают её, а создают
+данные в собственной группе со случайным VK ID.
+
+Фоновые воркеры приложения в тестах отключены: их запросы к базе
+попадали бы в фикстуру statements, а сжатие счётчиков сбрасывало бы
+кэш групп посреди теста.
+
+Запуск из корня репозитория:
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import os
+import random
+from urllib.parse import urlencode
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+os.environ["BACKGROUND_WORKERS_ENABLED"] = "false"
+
+from app.core.database import engine
+from app.main import app
+from app.routers.dependencies.auth import _sign_launch_params
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    """
+    Заголовок авторизации с подписанными параметрами запуска новой группы.
+    """
+    params = {"vk_app_id": "1", "vk_group_id": str(random.randint(10 ** 8, 10 ** 9)), "vk_user_id": "1"}
+    token = "https://vk.com/app?" + urlencode({**params, "sign": _sign_launch_params(params)})
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get("/api/auth", headers=headers)
+    assert response.status_code == 200, response.text
+    return headers
+
+
+@pytest.fixture
+def statements():
+    """
+    Список SQL-запросов, выполненных приложением во время теста.
+    """
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
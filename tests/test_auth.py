@@ -0,0 +1,48 @@
+"""
+Проверка подписи параметров запуска VK Mini App.
+"""
+from urllib.parse import urlencode
+
+import pytest
+
+from app.routers.dependencies.auth import _sign_launch_params
+
+
+def launch_token(params: dict, sign: str) -> dict:
+    return {"Authorization": "Bearer https://vk.com/app?" + urlencode({**params, "sign": sign})}
+
+
+@pytest.mark.parametrize("path", ["/api/auth", "/api/collectors", "/api/analytics"])
+def test_forged_token_is_rejected(client, path):
+    params = {"vk_app_id": "1", "vk_group_id": "1", "vk_user_id": "1"}
+    forged = _sign_launch_params({**params, "vk_group_id": "2"})
+
+    response = client.get(path, headers=launch_token(params, forged))
+
+    assert response.status_code == 401, response.text
+
+
+def test_token_without_sign_is_rejected(client):
+    response = client.get("/api/auth", headers={"Authorization": "Bearer https://vk.com/app?vk_group_id=1"})
+
+    assert response.status_code == 401, response.text
+
+
+def test_unregistered_group_cannot_import(client):
+    params = {"vk_app_id": "1", "vk_group_id": "1000000001", "vk_user_id": "1"}
+
+    response = client.post(
+        "/api/collectors/1/leads/import",
+        headers={**launch_token(params, _sign_launch_params(params)), "Content-Type": "text/csv"},
+        content="vk_id\n1\n"
+    )
+
+    assert response.status_code == 401, response.text
+
+
+def test_unregistered_group_cannot_export(client):
+    params = {"vk_app_id": "1", "vk_group_id": "1000000001", "vk_user_id": "1"}
+
+    response = client.get("/api/collectors/1/leads/export", headers=launch_token(params, _sign_launch_params(params)))
+
+    assert response.status_code == 401, response.text
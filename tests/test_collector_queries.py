@@ -0,0 +1,42 @@
+"""
+Количество запросов к базе при чтении сборщиков.
+
+Список и карточка сборщика читаются одним запросом без догрузки связей,
+а проверка принадлежности группе входит в тот же запрос.
+"""
+import pytest
+
+
+@pytest.fixture(scope="module")
+def collector_id(client, auth_headers):
+    response = client.post(
+        "/api/collectors",
+        headers=auth_headers,
+        json={"name": "Сборщик", "client_path_type": "messenger", "plugin": "senler"}
+    )
+    assert response.status_code == 201, response.text
+    collector_id = response.json()["id"]
+    for vk_id in range(5):
+        client.post(f"/api/collectors/{collector_id}/leads", json={"vk_id": str(vk_id)})
+    return collector_id
+
+
+@pytest.mark.parametrize(
+    "path, status_code",
+    [
+        ("/api/collectors", 200),
+        ("/api/{collector_id}", 200),
+        ("/api/0", 404),
+    ],
+    ids=["list", "detail", "missing"]
+)
+def test_collector_read_statement_count(client, auth_headers, collector_id, statements, path, status_code):
+    path = path.format(collector_id=collector_id)
+    # Первый запрос заполняет кэш группы, считается только второй
+    client.get(path, headers=auth_headers)
+    statements.clear()
+
+    response = client.get(path, headers=auth_headers)
+
+    assert response.status_code == status_code, response.text
+    assert len(statements) == 1, statements
@@ -0,0 +1,39 @@
+"""
+Разбор файлов импорта лидов.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.utils.lead_io import LeadImportError, parse_csv
+
+
+def parse(data: str, chunk_size: int = 3):
+    async def chunks():
+        raw = data.encode()
+        for start in range(0, len(raw), chunk_size):
+            yield raw[start:start + chunk_size]
+
+    async def collect():
+        return [record async for record in parse_csv(chunks())]
+
+    return asyncio.run(collect())
+
+
+def test_quoted_field_with_newline():
+    records = parse('vk_id,full_name\r\n1,"Иван\r\nИванов"\r\n2,"a ""b"""\r\n')
+
+    assert [record[2] for record in records] == ["Иван\nИванов", 'a "b"']
+
+
+def test_datetime_with_z_suffix():
+    (record,) = parse("vk_id,datetime_request\n1,2024-01-05T10:30:00Z\n")
+
+    assert record[4] == datetime(2024, 1, 5, 10, 30)
+    assert record[3] is True
+
+
+def test_unterminated_quoted_field():
+    with pytest.raises(LeadImportError):
+        parse('vk_id,full_name\n1,"open\n')